@@ -5,14 +5,17 @@
 #  
 # Este notebook trata da apresentação do espaço utilizado pelos arquivos de observações disponíveis para a utilização com o SMNA. As informações apresentadas não representam quantidades ou tipos de dados envolvidos ou utiizados no processo de assimilação de dados, mas apenas o espaço em disco utilizado por estes. As informações mais importantes que podem ser obtidas com este dashboard são o espaço em disco total utilizado por diferentes tipos de observações, separadas por horário sinótico, período e tipo de dados.
 #  
-# **Nota:** Se o slider que permite ajustar o período a ser visualizado não atualizar a tabela por completo (e.g., o slider está ajustado até a data 13 de Setembro, mas a tabela mostra resultados apenas até o dia 4 de Setembro), pode ser um indicativo de que os arquivos de observação não se encontram no disco verificado. 
+# **Nota:** Os ciclos sem arquivo de observação no disco verificado (e os arquivos com tamanho atípico, e.g., um prepbufr truncado) são listados na aba `Análise`, de acordo com o período e os tipos escolhidos. 
 # 
-# Para realizar o deploy do dashboard no GitHub, é necessário converter este notebook em um script executável, o que pode ser feito a partir da interface do Jupyter (`File` -> `Save and Export Notebook As...` -> `Executable Script`). A seguir, utilize o comando abaixo para converter o script em uma página HTML. Junto com a página, será gerado um arquivo JavaScript e ambos devem ser adicionados ao repositório, junto com o arquivo CSV.
+# Para realizar o deploy do dashboard no GitHub, utilize o comando abaixo para converter este script em uma página HTML. Junto com a página, será gerado um arquivo JavaScript e ambos devem ser adicionados ao repositório, junto com o arquivo CSV. O pacote `armobs` é sempre incluído na conversão; o resumo binário do inventário (`mon_rec_obs_resumo.npz`) é opcional e, sem ele, o dashboard lê o CSV completo antes da primeira exibição:
 #  
 # ```
-# panel convert SMNA-Dashboard.py --to pyodide-worker --out .
+# python -m armobs.lite mon_rec_obs_final.csv mon_rec_obs_resumo.npz
+# panel convert SMNA-Dashboard-ArmObs.py --to pyodide-worker --out . --requirements numpy pandas --resources armobs/*.py mon_rec_obs_resumo.npz
 # ```
 # 
+# Com o resumo, o dashboard exibe primeiro os totais diários de todos os horários e carrega o inventário completo (as demais colunas da tabela e a escolha dos horários) em segundo plano. No navegador, o dashboard abre na aba `Tabela` e os módulos de gráficos são instalados apenas quando a aba `Gráficos` é exibida.
+# 
 # Para utilizar o dashboard localmente, utilize o comando a seguir:
 # 
 # ```
@@ -26,12 +29,14 @@
 
 
 import os
+import io
+import html
+import asyncio
+import sys
 import glob
+import time
 import pandas as pd
-import hvplot.pandas
-import holoviews as hv
 import panel as pn
-import datetime
 import numpy as np
 
 from datetime import timedelta
@@ -45,7 +50,20 @@ from bokeh.transform import cumsum
 
 from bokeh.models.widgets.tables import DateFormatter
 
+from armobs import (SYNOPTIC_TIMES, LatestCall, Superseded, WindowedDataset, downsample, fillDate, forecastStorage,
+                    hasLatency, hourMask, lateFiles, latencyByOtype, memoryUsage, metrics)
+from armobs.analytics import WINDOW
+from armobs.export import FORMATS, exportFile, exportName, exportQuery
+from armobs.ingest import INVENTORY_URL, InventoryStore, MemoryInventory, readInventoryCsv
+from armobs.lite import SUMMARY_FILE, readSummary
+from armobs.session import executor
+from armobs.shared import sharedTable
+from armobs.sources import SOURCE_COLUMN, SourceRegistry, openSources, parseSources
+
 pn.extension(sizing_mode="stretch_width", notifications=True)
+
+# Início da sessão (instrumentação opcional, ARMOBS_METRICS=1; veja armobs.metrics)
+session_start = time.perf_counter()
 #pn.extension('perspective')
 #pn.extension('tabulator')
 
@@ -53,11 +71,42 @@ pn.extension(sizing_mode="stretch_width", notifications=True)
 # In[2]:
 
 
-dfs = pd.read_csv('https://raw.githubusercontent.com/GAD-DIMNT-CPTEC/SMNA-Dashboard-ArmObs/main/mon_rec_obs_final.csv', header=[0], 
-                  parse_dates=['Data do Download', 'Data da Observação'])
-
-#dfs = pd.read_csv('mon_rec_obs_final.csv', header=[0], parse_dates=['Data do Download', 'Data da Observação'])
-
+# Origem do inventário: diretório com as partições mensais (python -m armobs.ingest),
+# arquivo CSV local (e.g., ARMOBS_DATA=mon_rec_obs_final.csv) ou URL
+data_source = os.environ.get('ARMOBS_DATA', INVENTORY_URL)
+
+# Várias origens podem ser comparadas no dashboard (e.g., XC50, Egeon e os inventários
+# de cada usuário), com ARMOBS_SOURCES=nome=origem,nome=origem (veja armobs.sources)
+sources = parseSources(os.environ.get('ARMOBS_SOURCES'), default=data_source)
+
+# Intervalo (em segundos) entre as verificações de atualização do inventário (0 desativa)
+refresh_interval = int(os.environ.get('ARMOBS_REFRESH', 300))
+
+# No navegador (versão convertida com o panel convert, veja o README), o dashboard
+# inicia com o resumo binário do inventário (python -m armobs.lite), se incluído na
+# conversão, e o inventário completo é carregado em segundo plano, após a primeira
+# exibição; sem o resumo, o CSV completo é lido antes da primeira exibição
+BROWSER = sys.platform == 'emscripten'
+SUMMARY = BROWSER and os.path.exists(SUMMARY_FILE)
+
+# Índice do inventário (ordenado pela data da observação e agrupado por tipo de
+# observação, tipo de arquivo e horário sinótico), seleção compartilhada pelas
+# visualizações (memoizada pelos parâmetros dos widgets) e somas acumuladas do
+# tamanho dos arquivos, construídos para as partições que cobrem o período. No
+# servidor, o inventário de cada origem é lido uma única vez (as origens ao mesmo
+# tempo) e compartilhado por todas as sessões; no navegador, apenas a primeira origem é exibida
+if BROWSER:
+    from pyodide.http import open_url
+    
+    source_name = next(iter(sources))
+    dfs_browser = readSummary(SUMMARY_FILE) if SUMMARY else readInventoryCsv(open_url(sources[source_name]))
+    registry = SourceRegistry({source_name: WindowedDataset(MemoryInventory(dfs_browser),
+                                                            drop=['Nome do Arquivo'], maxsize=32)})
+else:
+    registry = openSources(sources, drop=['Nome do Arquivo'], refresh=refresh_interval)
+
+# Os inventários de cada usuário são exibidos como origens adicionais, e.g.,
+# ARMOBS_SOURCES=XC50=mon_rec_obs_final.csv,edu=mon_rec_obs_final-edu.csv,alex=mon_rec_obs_final-alex.csv
 #dfs_edu = pd.read_csv('mon_rec_obs_final-edu.csv', header=[0], parse_dates=['Data do Download', 'Data da Observação', 'Início do Ciclo AD'])
 #dfs_alex = pd.read_csv('mon_rec_obs_final-alex.csv', header=[0], parse_dates=['Data do Download', 'Data da Observação', 'Início do Ciclo AD'])
 
@@ -98,7 +147,22 @@ dfs = pd.read_csv('https://raw.githubusercontent.com/GAD-DIMNT-CPTEC/SMNA-Dashbo
 # In[3]:
 
 
-dfs = dfs.drop(['Nome do Arquivo'], axis=1)
+first_date, last_date = registry.bounds()
+
+# Período inicial: todo o inventário, se lido de um CSV, ou os últimos 90 dias,
+# se lido das partições mensais (apenas os meses do período são carregados)
+end_date = last_date
+if any(isinstance(windowed.inventory, InventoryStore) for windowed in registry.datasets.values()):
+    start_date = max(first_date, (last_date - timedelta(days=90)).normalize())
+else:
+    start_date = first_date
+
+def getDatasets(source_w, date_range):
+    start_date, end_date = date_range
+    return registry.cover(source_w, start_date, end_date)
+
+# As origens são carregadas ao mesmo tempo
+dfs = getDatasets(registry.names, (start_date, end_date))[registry.names[0]].frame
 
 
 # In[4]:
@@ -110,52 +174,106 @@ dfs
 # In[5]:
 
 
-start_date = datetime.datetime(2023, 1, 1, 0)
-end_date = datetime.datetime(2023, 10, 19, 0)
-
 values = (start_date, end_date)
 
-date_range_slider = pn.widgets.DatetimeRangePicker(name='Intervalo', value=values, enable_time=False)
+date_range_slider = pn.widgets.DatetimeRangePicker(name='Intervalo', value=values, start=first_date, end=last_date, enable_time=False)
 
 units = ['KB', 'MB', 'GB', 'TB', 'PB']
 otype = ['1bamua', '1bhrs4', 'airsev', 'atms', 'crisf4', 'eshrs3', 'esmhs', 'gome', 'gpsipw', 'gpsro', 'mtiasi', 'osbuv8', 'prepbufr', 'satwnd', 'sevcsr']
 ftype = ['gdas', 'gfs']
-synoptic_time_list = ['00Z', '06Z', '12Z', '18Z', '00Z e 12Z', '06Z e 18Z', '00Z, 06Z, 12Z e 18Z']
+synoptic_time_list = SYNOPTIC_TIMES
 
 units_w = pn.widgets.Select(name='Unidade', options=units)
 otype_w = pn.widgets.MultiChoice(name='Tipo de Observação', value=[otype[0]], options=otype, solid=False)
 ftype_w = pn.widgets.MultiChoice(name='Tipo de Arquivo', value=[ftype[0]], options=ftype, solid=False)
-synoptic_time = pn.widgets.RadioBoxGroup(name='Horário', options=synoptic_time_list, inline=False)
+synoptic_time = pn.widgets.CheckBoxGroup(name='Horário', value=[synoptic_time_list[0]], options=synoptic_time_list, inline=False)
 
-date_range = date_range_slider.value
+# O resumo contém os totais diários (somados sobre os horários): todos os horários são
+# exibidos até que o inventário completo seja carregado
+if SUMMARY:
+    synoptic_time.param.update(value=list(synoptic_time_list), disabled=True)
 
-######
-dic_size = {}
-def getSizeDic(dfsp, otype_w):
-    dfsp_tot_down_otype = dfsp['Tamanho do Download (KB)'].loc[dfsp['Tipo de Observação'] == otype_w[-1]].sum(axis=0)
-    dic_size[otype_w[-1]] = dfsp_tot_down_otype
-    return dic_size       
-   
-def subDataframe(df, start_date, end_date):
-    mask = (df['Data da Observação'] >= start_date) & (df['Data da Observação'] <= end_date)
-    return df.loc[mask]
+# Origens exibidas (com mais de uma, as origens são comparadas lado a lado)
+source_w = pn.widgets.MultiChoice(name='Fonte', value=registry.names[:1], options=registry.names, solid=False,
+                                  visible=len(registry.names) > 1)
 
-def subTimeDataFrame(synoptic_time):
-    if synoptic_time == '00Z': time_fmt0 = '00:00:00'; time_fmt1 = '00:00:00'
-    if synoptic_time == '06Z': time_fmt0 = '06:00:00'; time_fmt1 = '06:00:00'
-    if synoptic_time == '12Z': time_fmt0 = '12:00:00'; time_fmt1 = '12:00:00'
-    if synoptic_time == '18Z': time_fmt0 = '18:00:00'; time_fmt1 = '18:00:00'    
-    
-    if synoptic_time == '00Z e 12Z': time_fmt0 = '00:00:00'; time_fmt1 = '12:00:00'
-    if synoptic_time == '06Z e 18Z': time_fmt0 = '06:00:00'; time_fmt1 = '18:00:00'
-    
-    if synoptic_time == '00Z e 06Z': time_fmt0 = '00:00:00'; time_fmt1 = '06:00:00'
-    if synoptic_time == '12Z e 18Z': time_fmt0 = '12:00:00'; time_fmt1 = '18:00:00'    
-    
-    if synoptic_time == '00Z, 06Z, 12Z e 18Z': time_fmt0 = '00:00:00'; time_fmt1 = '18:00:00'   
-    
-    return time_fmt0, time_fmt1
+date_range = date_range_slider.value
+
+# Controles da tabela (paginação, ordenação e colunas)
+table_columns = registry.columns(start_date, end_date)
+
+page_w = pn.widgets.IntInput(name='Página', value=1, start=1)
+page_size_w = pn.widgets.Select(name='Linhas por página', value=50, options=[25, 50, 100, 250, 500])
+sort_w = pn.widgets.Select(name='Ordenar por', value='Data da Observação', options=table_columns)
+ascending_w = pn.widgets.Checkbox(name='Ordem crescente', value=True)
+columns_w = pn.widgets.MultiChoice(name='Colunas', value=table_columns, options=table_columns, solid=False)
+
+# Retorna à primeira página quando a seleção muda
+def resetPage(event):
+    page_w.value = 1
+
+for widget in [source_w, otype_w, ftype_w, synoptic_time, date_range_slider, page_size_w, sort_w, ascending_w]:
+    widget.param.watch(resetPage, 'value')
+
+paged_table = sharedTable
+
+# Exportação da seleção (todas as linhas e colunas, em blocos; no navegador, apenas CSV).
+# Com o plugin armobs.server (panel serve --plugins armobs.server), o botão abre a rota
+# /export, que envia o arquivo em blocos à medida que é escrito, sem guardá-lo inteiro na
+# memória; no navegador ou sem o plugin, o arquivo é escrito inteiro em memória (no
+# executor) e enviado pelo FileDownload
+export_w = pn.widgets.Select(name='Formato', value='csv', options=['csv'] if BROWSER else list(FORMATS))
+EXPORT_ROUTE = not BROWSER and 'armobs.server' in sys.modules
+
+def exportSelection(source_w, otype_w, ftype_w, synoptic_time, date_range, fmt):
+    return exportFile(registry.chunks(source_w, otype_w, ftype_w, synoptic_time, date_range), fmt)
+
+async def exportClicked():
+    args = (source_w.value, otype_w.value, ftype_w.value, synoptic_time.value, date_range_slider.value, export_w.value)
+    # O arquivo é escrito no executor (no navegador, onde não há threads, no próprio laço de eventos)
+    if BROWSER:
+        return exportSelection(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, exportSelection, *args)
+
+download_w = pn.widgets.FileDownload(callback=exportClicked, filename=exportName(date_range, export_w.value),
+                                     label='Exportar seleção', button_type='primary', embed=False)
+
+@pn.depends(export_w, date_range_slider.param.value, watch=True)
+def exportFilename(export_w, date_range):
+    download_w.filename = exportName(date_range, export_w)
+
+@pn.depends(source_w, otype_w, ftype_w, synoptic_time, date_range_slider.param.value, export_w)
+def exportLink(source_w, otype_w, ftype_w, synoptic_time, date_range, export_w):
+    # O endereço é relativo ao da página do dashboard (e ao prefixo do servidor, se houver)
+    url = 'export?' + exportQuery(source_w, otype_w, ftype_w, synoptic_time, date_range, export_w)
+    return pn.pane.HTML('<a class="armobs-export" href="{}" download="{}">Exportar seleção</a>'.format(
+        html.escape(url), exportName(date_range, export_w)), margin=(25, 10))
+
+# Versão dos dados exibidos (incrementada quando o inventário é recarregado)
+data_version = pn.widgets.IntInput(name='Versão dos dados', value=0, visible=False)
+
+# Número máximo de pontos do gráfico de linhas (aproximadamente a largura do gráfico em pixels), dividido
+# entre as séries exibidas, com ao menos min_points pontos por série
+max_points = 1000
+min_points = 100
+
+# Intervalo (em milissegundos) sem mudanças do zoom antes de reconstruir as séries do gráfico de linhas
+zoom_delay = 300
+
+# Os cálculos de cada visualização desta sessão são feitos fora do laço de eventos
+# (no navegador, onde não há threads, no próprio laço); mudanças rápidas dos widgets
+# são agrupadas e apenas o resultado da chamada mais recente é exibido
+calls = {name: LatestCall(delay=0.15, executor=None if BROWSER else executor)
+         for name in ['getTotDown', 'getTable', 'plotLine', 'plotSelSize', 'plotLatency', 'plotAnalysis']}
+
+async def compute(name, func, *args):
+    try:
+        return await calls[name](metrics.timed(name + '.compute')(func), *args)
+    except Superseded:
+        metrics.increment('superseded')
+        raise pn.param.Skip
 
+######
 def unitConvert(units_w):      
     if units_w == 'KB':
         factor = float(1)
@@ -185,86 +303,56 @@ def unitConvert(units_w):
     
     return factor, n1factor, n2factor, n3factor
 
-@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value)#, units_w)
-def getTotDown(otype_w, ftype_w, synoptic_time, date_range):#, units_w):
+def totalSize(otype_w, ftype_w, synoptic_time, date_range, source_w):
     start_date, end_date = date_range
-    dfs_tmp = dfs.copy()
-    dfs2 = subDataframe(dfs_tmp, start_date, end_date)    
-   
-    #factor, n1factor, n2factor, n3factor = unitConvert(units_w)
-
-    #dfs2[n1factor] = dfs2['Tamanho do Download (KB)'].multiply(factor)   
     
-    time_fmt0, time_fmt1 = subTimeDataFrame(synoptic_time)
-    
-    if time_fmt0 == time_fmt1:
-        dfsp = dfs2.loc[dfs2['Tipo de Observação'].isin(otype_w)].loc[dfs2['Tipo de Arquivo'].isin(ftype_w)].set_index('Data da Observação').at_time(str(time_fmt0)).reset_index()
-    else:
-        dfsp = dfs2.loc[dfs2['Tipo de Observação'].isin(otype_w)].loc[dfs2['Tipo de Arquivo'].isin(ftype_w)].set_index('Data da Observação').between_time(str(time_fmt0), str(time_fmt1), inclusive='both')
-            
-        if synoptic_time == '00Z e 12Z':
-            dfsp = dfsp.drop(dfsp.at_time('06:00:00').index).reset_index()
-        elif synoptic_time == '06Z e 18Z':    
-            dfsp = dfsp.drop(dfsp.at_time('12:00:00').index).reset_index()
-        elif synoptic_time == '00Z, 06Z, 12Z e 18Z':
-            dfsp = dfsp.reset_index()    
-            
-    #dfsp_tot_down = dfsp['Tamanho do Download (KB)'].sum(axis=0)
+    # Total obtido a partir do cubo de agregação de cada origem (independe do tamanho do período)
+    return registry.total(source_w, otype_w, ftype_w, hourMask(synoptic_time), start_date, end_date)
+
+@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, source_w, data_version)#, units_w)
+@metrics.timed('getTotDown')
+async def getTotDown(otype_w, ftype_w, synoptic_time, date_range, source_w, data_version):#, units_w):
+    #factor, n1factor, n2factor, n3factor = unitConvert(units_w)
     
     factor = float(1 / (1024 ** 3))
     n1factor = 'Tamanho do Download (GB)'
     n2factor = 'Tamanho (GB)'
     n3factor = 'Total Armazenado (GB):'    
     
-    #dfsp[n1factor] = dfsp['Tamanho do Download (KB)'].multiply(factor)
-    dfsp[n1factor] = dfsp.loc[:, 'Tamanho do Download (KB)'].multiply(factor)
-    
-    dfsp_tot_down = dfsp[n1factor].sum(axis=0)
-    
-    #dfsp_tot_down = dfsp['Tamanho do Download (KB)'].multiply(factor).sum(axis=0)
+    dfsp_tot_down = await compute('getTotDown', totalSize, otype_w, ftype_w, synoptic_time, date_range, source_w) * factor
     
-    #tot_down = pn.indicators.Number(name=n3factor, value=dfsp_tot_down * factor, format='{value:.2f}', font_size='16pt', title_size='12pt')
     tot_down = pn.indicators.Number(name=n3factor, value=dfsp_tot_down, format='{value:.2f}', font_size='16pt', title_size='12pt')
     
     return pn.Column(tot_down, sizing_mode="stretch_both")
 
-@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, units_w)
-def getTable(otype_w, ftype_w, synoptic_time, date_range, units_w):
-    start_date, end_date = date_range
-
-    dfs_tmp = dfs.copy()
-    dfs2 = subDataframe(dfs_tmp, start_date, end_date)    
+def tablePage(otype_w, ftype_w, synoptic_time, date_range, source_w, page_w, page_size_w, sort_w, ascending_w, columns_w):
+    dfsp = registry.selection(source_w, otype_w, ftype_w, synoptic_time, date_range)
+    
+    # Apenas a página visível é ordenada, projetada e convertida para HTML
+    dfpg, npages = paged_table.page(dfsp, page_w, page_size_w, sort_by=sort_w, ascending=ascending_w, columns=columns_w)
+    return dfpg, npages, len(dfsp)
+
+@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, source_w, units_w,
+            page_w, page_size_w, sort_w, ascending_w, columns_w, data_version)
+@metrics.timed('getTable')
+async def getTable(otype_w, ftype_w, synoptic_time, date_range, source_w, units_w,
+                   page_w, page_size_w, sort_w, ascending_w, columns_w, data_version):
+    dfpg, npages, nrows = await compute('getTable', tablePage, otype_w, ftype_w, synoptic_time, date_range, source_w,
+                                        page_w, page_size_w, sort_w, ascending_w, columns_w)
    
     factor, n1factor, n2factor, n3factor = unitConvert(units_w)
 
-    #factor = float(1)
-    #n1factor = 'Tamanho do Download (KB)'
-    #n2factor = 'Tamanho (KB)'
-    #n3factor = 'Total Armazenado (KB):'    
+    if 'Tamanho do Download (KB)' in dfpg.columns:
+        dfpg = dfpg.assign(**{n1factor: dfpg['Tamanho do Download (KB)'].multiply(factor)})
     
-    #dfs2[n1factor] = dfs2['Tamanho do Download (KB)'].multiply(factor)   
-    dfs2[n1factor] = dfs2.loc[:, 'Tamanho do Download (KB)'].multiply(factor)
-    
-    time_fmt0, time_fmt1 = subTimeDataFrame(synoptic_time)
-    
-    if time_fmt0 == time_fmt1:
-        dfsp = dfs2.loc[dfs2['Tipo de Observação'].isin(otype_w)].loc[dfs2['Tipo de Arquivo'].isin(ftype_w)].set_index('Data da Observação').at_time(str(time_fmt0)).reset_index()
-    else:
-        dfsp = dfs2.loc[dfs2['Tipo de Observação'].isin(otype_w)].loc[dfs2['Tipo de Arquivo'].isin(ftype_w)].set_index('Data da Observação').between_time(str(time_fmt0), str(time_fmt1), inclusive='both')
-            
-        if synoptic_time == '00Z e 12Z':
-            dfsp = dfsp.drop(dfsp.at_time('06:00:00').index).reset_index()
-        elif synoptic_time == '06Z e 18Z':    
-            dfsp = dfsp.drop(dfsp.at_time('12:00:00').index).reset_index()
-        elif synoptic_time == '00Z, 06Z, 12Z e 18Z':
-            dfsp = dfsp.reset_index()      
+    page_info = pn.pane.Markdown('Página {} de {} ({} linhas)'.format(min(max(page_w, 1), npages), npages, nrows))
     
     bokeh_formatters = {
         'Diferença de Tempo': models.DateFormatter(format='%d days %H:%M:%S'),
     }
 
     # Simples
-    df_tb = pn.pane.DataFrame(dfsp, 
+    df_tb = pn.pane.DataFrame(dfpg, 
                               name='DataFrame', 
                               height=600, 
                               #bold_rows=True,
@@ -319,130 +407,150 @@ def getTable(otype_w, ftype_w, synoptic_time, date_range, units_w):
 #                               }
 #                               )
     
-    return pn.Column(df_tb, sizing_mode="stretch_both")
+    return pn.Column(page_info, df_tb, sizing_mode="stretch_both")
        
-@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value)#, units_w)
-def plotLine(otype_w, ftype_w, synoptic_time, date_range):#, units_w):
-    for count, i in enumerate(otype_w):
-        for count2, j in enumerate(ftype_w):
-            if count == 0:
-                start_date, end_date = date_range
-                dfs_tmp = dfs.copy()
-                dfs2 = subDataframe(dfs_tmp, start_date, end_date)
-            
-                time_fmt0, time_fmt1 = subTimeDataFrame(synoptic_time)
-            
-                notype = otype_w[count]
-            
-                if time_fmt0 == time_fmt1:
-                    dfsp = dfs2.loc[dfs2['Tipo de Observação'] == str(i)].loc[dfs2['Tipo de Arquivo'] == str(j)].set_index('Data da Observação').at_time(str(time_fmt0)).reset_index()
-                else:
-                    dfsp = dfs2.loc[dfs2['Tipo de Observação'] == str(i)].loc[dfs2['Tipo de Arquivo'] == str(j)].set_index('Data da Observação').between_time(str(time_fmt0), str(time_fmt1), inclusive='both')                
-            
-                    if synoptic_time == '00Z e 12Z':
-                        dfsp = dfsp.drop(dfsp.at_time('06:00:00').index).reset_index()
-                    elif synoptic_time == '06Z e 18Z':    
-                        dfsp = dfsp.drop(dfsp.at_time('12:00:00').index).reset_index()
-                    elif synoptic_time == '00Z, 06Z, 12Z e 18Z':
-                        dfsp = dfsp.reset_index()              
-            
-                #factor, n1factor, n2factor, n3factor = unitConvert(units_w)
-            
-                factor = float(1 / (1024 ** 2))
-                n1factor = 'Tamanho do Download (MB)'
-                n2factor = 'Tamanho (MB)'
-                n3factor = 'Total Armazenado (MB):'                
-            
-                #dfsp[n1factor] = dfsp['Tamanho do Download (KB)'].multiply(factor)   
-                dfsp[n1factor] = dfsp.loc[:, 'Tamanho do Download (KB)'].multiply(factor)
-            
-                df_pl = dfsp.hvplot.line(x='Data da Observação', xlabel='Data', y=n1factor, 
-                                     ylabel=str(n2factor), label=str(notype), rot=90, grid=True, 
-                                     line_width=2, responsive=True,
-                                     color=Category20[20][count], min_height=550, min_width=850)
-            
-                sdf_pl = dfsp.hvplot.scatter(x='Data da Observação', y=n1factor, label=str(notype), responsive=True, color=Category20[20][count],
-                                             min_height=550, min_width=850)
-            
-            else:
-                
-                start_date, end_date = date_range
-                dfs_tmp = dfs.copy()
-                dfs2 = subDataframe(dfs_tmp, start_date, end_date)            
-            
-                time_fmt0, time_fmt1 = subTimeDataFrame(synoptic_time)
-            
-                notype = otype_w[count]
-            
-                if time_fmt0 == time_fmt1:
-                    dfsp = dfs2.loc[dfs2['Tipo de Observação'] == str(i)].loc[dfs2['Tipo de Arquivo'] == str(j)].set_index('Data da Observação').at_time(str(time_fmt0)).reset_index()
-                else:
-                    dfsp = dfs2.loc[dfs2['Tipo de Observação'] == str(i)].loc[dfs2['Tipo de Arquivo'] == str(j)].set_index('Data da Observação').between_time(str(time_fmt0), str(time_fmt1), inclusive='both')                
-            
-                    if synoptic_time == '00Z e 12Z':
-                        dfsp = dfsp.drop(dfsp.at_time('06:00:00').index).reset_index()
-                    elif synoptic_time == '06Z e 18Z':    
-                        dfsp = dfsp.drop(dfsp.at_time('12:00:00').index).reset_index()
-                    elif synoptic_time == '00Z, 06Z, 12Z e 18Z':
-                        dfsp = dfsp.reset_index()              
-                
-                #factor, n1factor, n2factor, n3factor = unitConvert(units_w)
-                
-                factor = float(1 / (1024 ** 2))
-                n1factor = 'Tamanho do Download (MB)'
-                n2factor = 'Tamanho (MB)'
-                n3factor = 'Total Armazenado (MB):'   
-                
-                #dfsp[n1factor] = dfsp['Tamanho do Download (KB)'].multiply(factor) 
-                dfsp[n1factor] = dfsp.loc[:, 'Tamanho do Download (KB)'].multiply(factor)
-                    
-                df_pl *= dfsp.hvplot.line(x='Data da Observação', xlabel='Data', y=n1factor, 
-                                      ylabel=n2factor, label=str(notype), rot=90, grid=True, 
-                                      line_width=2, responsive=True,
-                                      color=Category20[20][count], min_height=550, min_width=850)
-    
-                sdf_pl *= dfsp.hvplot.scatter(x='Data da Observação', y=n1factor, label=str(notype), responsive=True, color=Category20[20][count], 
-                                              min_height=550, min_width=850)
-    
-    return pn.Column(df_pl*sdf_pl, sizing_mode='stretch_width')
-    
-@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value)
-def plotSelSize(otype_w, ftype_w, synoptic_time, date_range):
+# No navegador, os módulos de gráficos são instalados uma única vez
+plotting_installed = False
+
+# Stream do zoom do gráfico de linhas (criado uma única vez, na primeira importação dos módulos de gráficos)
+ZoomRangeX = None
+
+def zoomStream(hv):
+    """Stream RangeX cujos eventos do zoom (e do deslocamento) são agrupados a cada zoom_delay milissegundos."""
+    from holoviews.plotting.bokeh.callbacks import RangeXCallback
+
+    class ZoomRangeX(hv.streams.RangeX):
+        pass
+
+    class ZoomRangeXCallback(RangeXCallback):
+        debounce = zoom_delay
+
+    # Apenas o gráfico de linhas usa este stream; os demais RangeX mantêm o intervalo padrão do HoloViews
+    hv.streams.Stream._callbacks['bokeh'][ZoomRangeX] = ZoomRangeXCallback
+    return ZoomRangeX
+
+async def loadPlotting():
+    """Importa os módulos de gráficos apenas quando necessários (no navegador, eles são instalados sob demanda)."""
+    global plotting_installed, ZoomRangeX
+    if BROWSER and not plotting_installed:
+        import micropip
+        await micropip.install(['holoviews'])
+        plotting_installed = True
+    import holoviews as hv
+    import holoviews.plotting.bokeh
+    if ZoomRangeX is None:
+        ZoomRangeX = zoomStream(hv)
+    return hv
+
+def lineSeries(otype_w, ftype_w, synoptic_time, date_range, source_w):
+    dfs_sel = registry.selection(source_w, otype_w, ftype_w, synoptic_time, date_range)
+
+    # Agrupa a seleção uma única vez por (origem, tipo de observação, tipo de arquivo); cada série
+    # está em ordem cronológica, pois a seleção está ordenada pela data da observação
+    dates = dfs_sel['Data da Observação'].to_numpy()
+    sizes = dfs_sel['Tamanho do Download (KB)'].to_numpy()
+    keys = ['Tipo de Observação', 'Tipo de Arquivo']
+    by_source = SOURCE_COLUMN in dfs_sel.columns and len(source_w) > 1
+    if by_source:
+        keys = [SOURCE_COLUMN] + keys
+    groups = dfs_sel.groupby(keys, observed=True, sort=False).indices
+
+    series = []
+    for k, source in enumerate(source_w if by_source else [None]):
+        for count, i in enumerate(otype_w):
+            for j in ftype_w:
+                rows = groups.get((source, i, j) if by_source else (i, j))
+                if rows is None:
+                    continue
+                label = str(i) if len(ftype_w) == 1 else '{} ({})'.format(i, j)
+                if by_source:
+                    label = '{}: {}'.format(source, label)
+                color = Category20[20][(k * len(otype_w) + count) % 20]
+                series.append((label, color, dates[rows], sizes[rows]))
+    
+    # Valores atípicos e ciclos ausentes das séries exibidas (armobs.analytics)
     start_date, end_date = date_range
-    #dfs_tmp = dfs.copy()
-    #dfs2 = subDataframe(dfs_tmp, start_date, end_date) 
-    dfs2 = subDataframe(dfs, start_date, end_date) 
+    hour_mask = hourMask(synoptic_time)
+    outliers = registry.outliers(source_w, otype_w, ftype_w, hour_mask, start_date, end_date)
+    missing = registry.missing(source_w, otype_w, ftype_w, hour_mask, start_date, end_date)
+    return series, outliers, missing
+
+@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, source_w, data_version)#, units_w)
+@metrics.timed('plotLine')
+async def plotLine(otype_w, ftype_w, synoptic_time, date_range, source_w, data_version):#, units_w):
+    hv = await loadPlotting()
+
+    series, outliers, missing = await compute('plotLine', lineSeries, otype_w, ftype_w, synoptic_time, date_range, source_w)
+
+    #factor, n1factor, n2factor, n3factor = unitConvert(units_w)
+
+    factor = float(1 / (1024 ** 2))
+    n1factor = 'Tamanho do Download (MB)'
+    n2factor = 'Tamanho (MB)'
+    n3factor = 'Total Armazenado (MB):'                
+
+    # As séries são reduzidas à resolução da tela (preservando os picos) e
+    # reconstruídas com mais detalhes quando o gráfico é ampliado
+    points = max(max_points // max(len(series), 1), min_points)
+
+    @metrics.timed('plotLine.lines')
+    def lines(x_range):
+        layers = []
+        for label, color, x, y in series:
+            if x_range is not None:
+                lo = x.searchsorted(np.datetime64(pd.Timestamp(x_range[0])), side='left')
+                hi = x.searchsorted(np.datetime64(pd.Timestamp(x_range[1])), side='right')
+                lo, hi = max(lo - 1, 0), min(hi + 1, len(x))
+            else:
+                lo, hi = 0, len(x)
+
+            with metrics.stage('plotLine.downsample') as stage:
+                stage.rows = hi - lo
+                keep = lo + downsample(x[lo:hi], y[lo:hi], points, method='lttb')
+            # A conversão de unidades é aplicada apenas aos pontos exibidos
+            layers.append(hv.Curve((x[keep], y[keep] * factor), 'Data da Observação', n1factor,
+                                   label=label).opts(color=color, line_width=2, tools=['hover']))
+
+        # Valores atípicos (x vermelho) e ciclos ausentes (triângulo cinza sobre o eixo) no período exibido
+        if layers:
+            for flagged, label, options in [(outliers, 'Tamanho atípico', dict(color='red', marker='x', size=10)),
+                                            (missing, 'Ciclo ausente', dict(color='gray', marker='triangle', size=7))]:
+                x = flagged['Data da Observação']
+                if x_range is not None:
+                    flagged = flagged[x.between(pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])).to_numpy()]
+                if flagged.empty:
+                    continue
+                y = flagged['Tamanho do Download (KB)'] * factor if 'Tamanho do Download (KB)' in flagged else 0.0
+                dff = pd.DataFrame({'Data da Observação': flagged['Data da Observação'], n1factor: y})
+                layers.append(hv.Scatter(dff, 'Data da Observação', n1factor, label=label).opts(tools=['hover'], **options))
+        else:
+            layers.append(hv.Curve([], 'Data da Observação', n1factor))
+
+        return hv.Overlay(layers).opts(xlabel='Data', ylabel=n2factor, xrotation=90, show_grid=True,
+                                       responsive=True, min_height=550, min_width=850)
+
+    df_pl = hv.DynamicMap(lines, streams=[ZoomRangeX()])
     
-    time_fmt0, time_fmt1 = subTimeDataFrame(synoptic_time)    
-        
-    if time_fmt0 == time_fmt1:
-        dfsp = dfs2.loc[dfs2['Tipo de Observação'].isin(otype_w)].loc[dfs2['Tipo de Arquivo'].isin(ftype_w)].set_index('Data da Observação').at_time(str(time_fmt0)).reset_index()
-    else:
-        dfsp = dfs2.loc[dfs2['Tipo de Observação'].isin(otype_w)].loc[dfs2['Tipo de Arquivo'].isin(ftype_w)].set_index('Data da Observação').between_time(str(time_fmt0), str(time_fmt1), inclusive='both')
-            
-        if synoptic_time == '00Z e 12Z':
-            dfsp = dfsp.drop(dfsp.at_time('06:00:00').index).reset_index()
-        elif synoptic_time == '06Z e 18Z':    
-            dfsp = dfsp.drop(dfsp.at_time('12:00:00').index).reset_index()
-        elif synoptic_time == '00Z, 06Z, 12Z e 18Z':
-            dfsp = dfsp.reset_index()      
+    return pn.Column(df_pl, sizing_mode='stretch_width')
     
+def sizeByOtype(otype_w, ftype_w, synoptic_time, date_range, source_w):
+    start_date, end_date = date_range
+    
+    # Tamanho do download (ou do espaço ocupado) de cada tipo de observação, de acordo com a seleção da tabela
+    return registry.sizeByOtype(source_w, otype_w, ftype_w, hourMask(synoptic_time), start_date, end_date)
+
+@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, source_w, data_version)
+@metrics.timed('plotSelSize')
+async def plotSelSize(otype_w, ftype_w, synoptic_time, date_range, source_w, data_version):
     factor = float(1)
     n1factor = 'Tamanho do Download (KB)'
     n2factor = 'Tamanho (KB)'
     n3factor = 'Total Armazenado (KB):'    
     
-    # Tamanho do download (ou do espaço ocupado), de acordo com a seleção da tabela
-    dfsp_tot_down = dfsp['Tamanho do Download (KB)'].sum(axis=0)
-    
-    dfsp_dic_down = getSizeDic(dfsp, otype_w)
-    
-    # Remove a observação da lista a ser plotada         
-    for key in list(dfsp_dic_down):
-        if key not in otype_w:
-            del dfsp_dic_down[key]        
+    dfsp_dic_down = await compute('plotSelSize', sizeByOtype, otype_w, ftype_w, synoptic_time, date_range, source_w)
+    dfsp_tot_down = dfsp_dic_down.sum()
         
-    data = pd.Series(dfsp_dic_down).reset_index(name='Tamanho do Download (KB)').rename(columns={'index':'Tipo de Observação'})  
+    data = dfsp_dic_down.reset_index(name='Tamanho do Download (KB)').rename(columns={'index':'Tipo de Observação'})  
     
     # Acrescenta uma nova coluna 'Tamanho Relativo' à série data
     data['Tamanho Relativo (%)'] = (data['Tamanho do Download (KB)'] / dfsp_tot_down) * 100
@@ -471,6 +579,129 @@ def plotSelSize(otype_w, ftype_w, synoptic_time, date_range):
 
     #return pn.Column(pn.pane.Bokeh(p), sizing_mode='stretch_width')    
     return pn.pane.Bokeh(p)
+
+# Número máximo de arquivos atrasados exibidos na tabela da aba Latência
+late_rows = 500
+
+def latencySummary(otype_w, ftype_w, synoptic_time, date_range, source_w):
+    dfs_sel = registry.selection(source_w, otype_w, ftype_w, synoptic_time, date_range)
+    
+    # No navegador, as datas do download e do início do ciclo AD são carregadas depois
+    if not hasLatency(dfs_sel):
+        return None, None
+    return latencyByOtype(dfs_sel), lateFiles(dfs_sel, limit=late_rows)
+
+@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, source_w, data_version)
+@metrics.timed('plotLatency')
+async def plotLatency(otype_w, ftype_w, synoptic_time, date_range, source_w, data_version):
+    stats, late = await compute('plotLatency', latencySummary, otype_w, ftype_w, synoptic_time, date_range, source_w)
+    
+    if stats is None:
+        return pn.pane.Markdown('A latência será exibida após o carregamento completo do inventário.')
+    
+    # Distribuição da latência de cada tipo de observação: caixa entre os quantis de
+    # 25% e 75%, linha entre os quantis de 5% e 95% e a mediana
+    data = stats.reset_index()
+    data['Tipo de Observação'] = data['Tipo de Observação'].astype(str)
+    data['color'] = [Category20[20][otype.index(i) % 20] if i in otype else Category20[20][0] 
+                     for i in data['Tipo de Observação']]
+    
+    p = figure(x_range=list(data['Tipo de Observação']), min_width=850, min_height=550, sizing_mode='stretch_width',
+               title='Latência (horas entre a data da observação e o download)',
+               tooltips=[('Tipo de Observação', '@{Tipo de Observação}'), ('Mediana', '@q50{0.00} h'),
+                         ('Quantis 5% - 95%', '@q05{0.00} h - @q95{0.00} h'), ('Arquivos', '@Arquivos'),
+                         ('Atrasados', '@Atrasados'), ('Sem log do GSI', '@{Sem Log do GSI}')])
+    
+    p.segment(x0='Tipo de Observação', y0='q05', x1='Tipo de Observação', y1='q95', line_color='black', source=data)
+    p.vbar(x='Tipo de Observação', bottom='q25', top='q75', width=0.6, fill_color='color', line_color='black', source=data)
+    p.rect(x='Tipo de Observação', y='q50', width=0.6, height=0.01, height_units='screen', line_color='black', source=data)
+    
+    p.xaxis.major_label_orientation = pi / 4
+    p.yaxis.axis_label = 'Latência (horas)'
+    
+    nlate = int(stats['Atrasados'].sum())
+    late_info = 'Arquivos disponíveis após o início do ciclo AD: {}'.format(nlate)
+    if nlate > len(late):
+        late_info += ' (exibidos os {} mais atrasados)'.format(len(late))
+    
+    df_late = pn.pane.DataFrame(late, name='Atrasados', height=400, index=False, sizing_mode='stretch_width')
+    
+    return pn.Column(pn.pane.Bokeh(p), pn.pane.Markdown(late_info), df_late, sizing_mode='stretch_width')
+    
+# Previsão do espaço ocupado e capacidade do disco (em TB; 0 para não exibir)
+method_w = pn.widgets.Select(name='Tendência', value='linear', options={'Linear': 'linear', 'Sazonal': 'seasonal'})
+horizon_w = pn.widgets.IntInput(name='Horizonte (dias)', value=365, start=30, step=30)
+capacity_w = pn.widgets.FloatInput(name='Capacidade (TB)', value=float(os.environ.get('ARMOBS_CAPACITY', 0)), start=0)
+
+# Número máximo de ciclos ausentes e de valores atípicos exibidos nas tabelas da aba Análise
+analysis_rows = 500
+
+def analysisSummary(otype_w, ftype_w, synoptic_time, date_range, source_w, method_w, horizon_w):
+    start_date, end_date = date_range
+    hour_mask = hourMask(synoptic_time)
+    
+    daily = registry.dailyTotals(source_w, otype_w, ftype_w, hour_mask, start_date, end_date)
+    # O acumulado parte do total já armazenado antes do período escolhido
+    first_date, _ = registry.bounds(source_w)
+    initial = 0.0
+    if first_date is not None and pd.Timestamp(first_date) < pd.Timestamp(start_date):
+        initial = registry.total(source_w, otype_w, ftype_w, hour_mask, first_date,
+                                 pd.Timestamp(start_date) - pd.Timedelta(1, 'ns'))
+    forecast = forecastStorage(daily, horizon=horizon_w, method=method_w, initial=initial)
+    missing = registry.missing(source_w, otype_w, ftype_w, hour_mask, start_date, end_date)
+    outliers = registry.outliers(source_w, otype_w, ftype_w, hour_mask, start_date, end_date)
+    return forecast, missing, outliers
+
+@pn.depends(otype_w, ftype_w, synoptic_time, date_range_slider.param.value, source_w, method_w, horizon_w, capacity_w,
+            data_version)
+@metrics.timed('plotAnalysis')
+async def plotAnalysis(otype_w, ftype_w, synoptic_time, date_range, source_w, method_w, horizon_w, capacity_w,
+                       data_version):
+    forecast, missing, outliers = await compute('plotAnalysis', analysisSummary, otype_w, ftype_w, synoptic_time,
+                                                date_range, source_w, method_w, horizon_w)
+    
+    factor = float(1 / (1024 ** 3))
+    capacity = capacity_w * 1024 ** 4
+    
+    # Total acumulado no período (observado e previsto), em GB
+    data = (forecast * factor).rename_axis('Data').reset_index()
+    
+    p = figure(x_axis_type='datetime', min_width=850, min_height=450, sizing_mode='stretch_width',
+               title='Total Armazenado (GB) e previsão',
+               tooltips=[('Data', '@Data{%F}'), ('Acumulado', '@Acumulado{0.00} GB'), ('Previsão', '@{Previsão}{0.00} GB')])
+    p.hover.formatters = {'@Data': 'datetime'}
+    p.line(x='Data', y='Acumulado', line_width=2, color=Category20[20][0], legend_label='Observado', source=data)
+    p.line(x='Data', y='Previsão', line_width=2, line_dash='dashed', color=Category20[20][2], legend_label='Previsão',
+           source=data)
+    p.legend.location = 'top_left'
+    p.yaxis.axis_label = 'Total Armazenado (GB)'
+    
+    if capacity > 0:
+        p.add_layout(models.Span(location=capacity * factor, dimension='width', line_color='red', line_dash='dotted'))
+        full = fillDate(forecast, capacity)
+        if full is None:
+            fill_info = 'A capacidade de {:.2f} TB não é atingida no horizonte da previsão.'.format(capacity_w)
+        else:
+            fill_info = 'A capacidade de {:.2f} TB é atingida em {:%d/%m/%Y}.'.format(capacity_w, full)
+    else:
+        fill_info = 'Informe a capacidade do disco (em TB) para estimar a data em que ela será atingida.'
+    
+    missing_info = 'Ciclos sem arquivo no disco verificado: {}'.format(len(missing))
+    if len(missing) > analysis_rows:
+        missing_info += ' (exibidos os {} mais recentes)'.format(analysis_rows)
+    outliers_info = 'Arquivos com tamanho atípico (em relação à mediana dos {} dias anteriores): {}'.format(
+        WINDOW, len(outliers))
+    if len(outliers) > analysis_rows:
+        outliers_info += ' (exibidos os {} mais recentes)'.format(analysis_rows)
+    
+    df_missing = pn.pane.DataFrame(missing.tail(analysis_rows), name='Ciclos Ausentes', height=300, index=False,
+                                   sizing_mode='stretch_width')
+    df_outliers = pn.pane.DataFrame(outliers.tail(analysis_rows), name='Tamanhos Atípicos', height=300, index=False,
+                                    sizing_mode='stretch_width')
+    
+    return pn.Column(pn.pane.Bokeh(p), pn.pane.Markdown(fill_info),
+                     pn.pane.Markdown(missing_info), df_missing,
+                     pn.pane.Markdown(outliers_info), df_outliers, sizing_mode='stretch_width')
     
 ######    
 
@@ -485,25 +716,109 @@ notes = """
 * **Tipo de Arquivo**: refere-se aos arquivos do tipo `gdas` ou `gfs`. Ambos são disseminados pelo NCEP, mas os arquivos `gdas` possuem mais informações do que os arquivos `gfs`. Os arquivos `gfs` são disseminados antes do que os arquivos `gdas`;
 * **Horário Sinótico**: refere-se ao horário sinótico do ciclo de análise ao qual as observações pertencem;
 * **Tipo de Observação**: refere-se ao mnemônico utilizado pelo GSI para identificar os diferentes tipo de observações;
-* **Diferença de Tempo**: refere-se à diferença entre a data da observação e a data do donwload. Efetivamente, é calculado como: `dfs['Diferença de Tempo'] = (dfs['Data do Download'] - dfs['Data da Observação']) - timedelta(hours=3)`, sendo o `timedelta(hours=3)` subtraído da diferença entre as datas para descontar a diferença do fuso horário.
+* **Diferença de Tempo**: refere-se à diferença entre a data da observação e a data do donwload. Efetivamente, é calculado como: `dfs['Diferença de Tempo'] = (dfs['Data do Download'] - dfs['Data da Observação']) - timedelta(hours=3)`, sendo o `timedelta(hours=3)` subtraído da diferença entre as datas para descontar a diferença do fuso horário;
+* **Fonte**: refere-se à origem do inventário (e.g., XC50 ou Egeon), exibida quando mais de uma origem é comparada;
+* **Margem para o Ciclo AD**: refere-se à diferença entre o início do ciclo AD e a data do download (ambas registradas no horário da máquina). Valores negativos indicam arquivos que chegaram depois do início do ciclo de assimilação (arquivos atrasados, exibidos na aba `Latência`);
+* **Ciclo ausente**: refere-se a um ciclo sem arquivo de observação no disco verificado, posterior ao primeiro arquivo da série (tipo de observação, tipo de arquivo e horário sinótico). Os ciclos ausentes são listados na aba `Análise` e marcados no gráfico de linhas;
+* **Tamanho atípico**: refere-se a um arquivo com menos da metade do tamanho mediano dos dias anteriores da mesma série (e.g., um download truncado) ou muito distante dele.
 
 Além disso, no gráfico de linhas os tamanhos dos arquivos são mostrados em MB (megabytes) e o total armazenado, em GB (gigabytes). Para as conversões entre as unidades (KB para MB e GB), considera-se que 1 MB(GB) = 1024 KB(MB).
 """
 
-card_parameters = pn.Card(date_range_slider, synoptic_time, ftype_w, otype_w, title='Parâmetros', collapsed=False)
+card_parameters = pn.Card(source_w, date_range_slider, synoptic_time, ftype_w, otype_w, title='Parâmetros', collapsed=False)
 
+# O conteúdo de cada aba é construído apenas quando ela é exibida (a latência e a
+# análise das séries são calculadas apenas quando a aba é aberta); no navegador, o
+# dashboard abre na aba Tabela, de modo que os módulos de gráficos são instalados
+# apenas quando a aba Gráficos é exibida
 tabs_contents = pn.Tabs(
     ('Gráficos', pn.Row(plotLine, plotSelSize)),
-    ('Tabela', getTable), 
-    dynamic=False)
+    ('Tabela', pn.Column(pn.Row(page_w, page_size_w, sort_w, ascending_w), columns_w, getTable,
+                         pn.Row(export_w, exportLink if EXPORT_ROUTE else download_w))), 
+    ('Latência', pn.Column(pn.param.ParamFunction(plotLatency, lazy=True))),
+    ('Análise', pn.Column(pn.Row(method_w, horizon_w, capacity_w), pn.param.ParamFunction(plotAnalysis, lazy=True))),
+    dynamic=True, active=1 if BROWSER else 0)
+
+# Aba de diagnóstico (oculta): exibida apenas com a instrumentação ativada e o
+# parâmetro ?diagnostico na URL do dashboard
+diagnostics_w = pn.widgets.Button(name='Atualizar', button_type='primary', width=120)
+
+@pn.depends(diagnostics_w)
+def getDiagnostics(clicks):
+    snapshot = metrics.registry.snapshot()
+    
+    stages = pd.DataFrame.from_dict(snapshot['stages'], orient='index')
+    if not stages.empty:
+        stages['mean_ms'] = stages['seconds'] / stages['count'] * 1000
+        stages = stages.sort_index()
+    caches = pd.DataFrame.from_dict(snapshot['caches'], orient='index')
+    counters = pd.Series(snapshot['counters'], name='count', dtype='int64')
+    # Memória utilizada pelos inventários carregados de cada origem
+    memory = pd.Series({name: memoryUsage(windowed.dataset.frame) / 1024 ** 2
+                        for name, windowed in registry.datasets.items() if windowed.dataset is not None},
+                       name='MB', dtype='float64')
+    
+    return pn.Column(pn.pane.Markdown('### Memória'), pn.pane.DataFrame(memory.to_frame(), float_format='{:.1f}'.format),
+                     pn.pane.Markdown('### Etapas'), pn.pane.DataFrame(stages, float_format='{:.4f}'.format),
+                     pn.pane.Markdown('### Caches'), pn.pane.DataFrame(caches),
+                     pn.pane.Markdown('### Eventos'), pn.pane.DataFrame(counters.to_frame()))
+
+if metrics.ENABLED and 'diagnostico' in pn.state.session_args:
+    tabs_contents.append(('Diagnóstico', pn.Column(diagnostics_w, getDiagnostics)))
+
+async def loadDetails():
+    """Carrega o inventário completo (todas as colunas da tabela) após a primeira exibição no navegador."""
+    from pyodide.http import pyfetch
+    
+    response = await pyfetch(sources[source_name])
+    dfs_full = readInventoryCsv(io.StringIO(await response.string()))
+    
+    registry.datasets[source_name] = WindowedDataset(MemoryInventory(dfs_full), drop=['Nome do Arquivo'], maxsize=32)
+    
+    table_columns = registry.columns(*date_range_slider.value)
+    sort_w.options = table_columns
+    columns_w.param.update(options=table_columns, value=table_columns)
+    synoptic_time.disabled = False
+    data_version.value += 1
+
+if SUMMARY:
+    pn.state.onload(loadDetails)
+
+# Versão dos inventários exibida nesta sessão
+session_version = registry.version
+
+def checkVersion():
+    """Atualiza a sessão quando uma nova versão do inventário é carregada em segundo plano."""
+    global session_version
+    
+    if registry.version == session_version:
+        return
+    session_version = registry.version
+    
+    first_date, last_date = registry.bounds()
+    start_date, end_date = date_range_slider.value
+    following = end_date >= date_range_slider.end
+    
+    date_range_slider.param.update(start=first_date, end=last_date)
+    
+    # O período acompanha os novos ciclos se terminava no último ciclo disponível
+    if following:
+        date_range_slider.value = (start_date, last_date)
+    else:
+        data_version.value += 1
+
+if not BROWSER and refresh_interval:
+    pn.state.add_periodic_callback(checkVersion, period=10000)
 
 pn.template.FastListTemplate(
     site="SMNA Dashboard", title="Armazenamento Observações (ArmObs)",
     sidebar = [card_parameters],
-    main=["Visualização do armazenamento das observações do **SMNA**", tabs_contents, getTotDown, notes]
+    main=["Visualização do armazenamento das observações do **SMNA**", getTotDown, tabs_contents, notes]
 #).show();
 ).servable();
 
+metrics.observe('session.startup', time.perf_counter() - session_start)
+
 
 # In[ ]:
 
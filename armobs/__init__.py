@@ -0,0 +1,20 @@
+# Rotinas de apoio ao SMNA-Dashboard-ArmObs
+#
+# O dashboard (SMNA-Dashboard-ArmObs.py) importa deste pacote a lógica de
+# seleção e agregação do inventário das observações, de forma que ela possa
+# ser reutilizada fora do Panel. Os módulos com interface de linha de comando
+# (e.g., armobs.ingest) são importados diretamente.
+
+from armobs.analytics import SeriesAnalytics, analyticsFor, fillDate, forecastStorage
+from armobs.cache import LRUCache
+from armobs.dataset import Dataset, WindowedDataset
+from armobs.downsample import downsample, lttb, minmax
+from armobs.export import exportFile, exportName, exportQuery, writeChunks
+from armobs.index import InventoryIndex
+from armobs.latency import gsiMargin, hasLatency, lateFiles, latencyByOtype, timeDifference
+from armobs.rollup import RollupCube
+from armobs.schema import compactInventory, memoryUsage
+from armobs.selection import Selection, filterInventory, selectionKey
+from armobs.session import LatestCall, Superseded
+from armobs.synoptic import SYNOPTIC_TIMES, hourMask, maskHours
+from armobs.table import PagedTable, pageCount
@@ -0,0 +1,268 @@
+# Análise das séries de tamanho dos arquivos de observação
+#
+# Cada combinação (tipo de observação, tipo de arquivo, horário sinótico) do
+# inventário é uma série diária (um arquivo por ciclo). As séries são
+# guardadas juntas em uma matriz (séries x dias, NaN nos dias sem arquivo) e
+# todas as estatísticas são calculadas de uma só vez sobre a matriz:
+#
+# * mediana e desvio absoluto mediano (MAD) móveis dos dias anteriores;
+# * valores atípicos: arquivos muito menores do que a mediana (e.g., um
+#   download truncado do prepbufr) ou muito distantes dela (em MADs);
+# * ciclos ausentes: dias sem arquivo após o início de cada série;
+# * previsão do espaço ocupado (tendência linear, ou sazonal, do total diário
+#   acumulado).
+#
+# A matriz é atualizada de forma incremental: quando o inventário recebe novos
+# ciclos, apenas as linhas a partir do primeiro dia modificado são
+# incorporadas e as estatísticas móveis são recalculadas apenas a partir desse
+# dia. Os arquivos que chegam atrasados (e.g., os arquivos gdas, acrescentados
+# ao inventário depois dos arquivos gfs do mesmo ciclo) modificam dias já
+# incorporados; eles são identificados pelo número de linhas de cada dia.
+
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from armobs.synoptic import maskHours
+
+# Dias anteriores considerados nas estatísticas móveis
+WINDOW = 28
+
+# Valores atípicos: fração mínima da mediana e distância máxima (em MADs) da mediana
+DROP_RATIO = 0.5
+THRESHOLD = 5.0
+
+# Fator que torna o MAD comparável ao desvio padrão (distribuição normal)
+MAD_SCALE = 1.4826
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+def _rolling(values, window):
+    """Mediana e MAD móveis (dos ``window`` dias anteriores) de cada linha de ``values`` (séries x dias)."""
+    frame = pd.DataFrame(values.T)
+    rolling = frame.rolling(window, min_periods=max(window // 4, 1))
+    median = rolling.median().shift(1)
+    mad = (frame - median).abs().rolling(window, min_periods=max(window // 4, 1)).median().shift(1)
+    return median.to_numpy().T, mad.to_numpy().T
+
+
+class SeriesAnalytics:
+    """Séries diárias de cada (otype, ftype, hora) de um inventário e as suas estatísticas móveis.
+
+    ``update`` incorpora o Dataset mais recente do inventário; os resultados
+    são substituídos (e não modificados) a cada atualização, de modo que
+    podem ser lidos por várias sessões ao mesmo tempo (as consultas aguardam
+    o fim de uma atualização em andamento).
+    """
+
+    def __init__(self, window=WINDOW, drop_ratio=DROP_RATIO, threshold=THRESHOLD):
+        self.window = window
+        self.drop_ratio = drop_ratio
+        self.threshold = threshold
+        self.dataset = None
+        # (otype, ftype, hora) de cada linha da matriz e a posição de cada combinação
+        self.keys = []
+        self.rows = {}
+        self.days = np.empty(0, dtype='datetime64[D]')
+        self.sizes = np.empty((0, 0))
+        self.median = np.empty((0, 0))
+        self.mad = np.empty((0, 0))
+        # Posição da primeira linha de cada dia no índice do inventário incorporado
+        self.offsets = np.empty(0, dtype=np.int64)
+        # Data da observação do último ciclo incorporado
+        self.last = None
+        self._lock = threading.Lock()
+
+    def update(self, dataset):
+        """Incorpora os ciclos do ``dataset`` (armobs.dataset.Dataset) posteriores à última atualização."""
+        if dataset is self.dataset:
+            return self
+        with self._lock:
+            if dataset is not self.dataset:
+                self._update(dataset)
+                self.dataset = dataset
+        return self
+
+    def _update(self, dataset):
+        index = dataset.index
+        dates = index.dates
+        if len(dates) == 0:
+            return
+        first_day = dates[0].astype('datetime64[D]')
+
+        # O inventário foi recarregado com ciclos anteriores aos já incorporados: a matriz é reconstruída
+        rebuild = self.last is None or first_day < self.days[0]
+        if rebuild:
+            start = first_col = 0
+        else:
+            # Primeiro dia já incorporado cujo número de linhas mudou (arquivos atrasados); o último
+            # dia já incorporado é sempre recalculado
+            offsets = np.searchsorted(dates, self.days.astype(dates.dtype), side='left')
+            changed = np.flatnonzero(offsets != self.offsets)
+            first_col = len(self.days) - 1 if len(changed) == 0 else max(int(changed[0]) - 1, 0)
+            start = int(offsets[first_col])
+        frame = index.frame.iloc[start:]
+
+        keys = pd.MultiIndex.from_arrays([frame['Tipo de Observação'].to_numpy(), frame['Tipo de Arquivo'].to_numpy(),
+                                          index.hours[start:]])
+        codes, uniques = keys.factorize()
+        key_list, rows = ([], {}) if rebuild else (list(self.keys), dict(self.rows))
+        for key in uniques:
+            if key[0] is None or key[1] is None or pd.isna(key[0]) or pd.isna(key[1]):
+                continue
+            key = (key[0], key[1], int(key[2]))
+            if key not in rows:
+                rows[key] = len(key_list)
+                key_list.append(key)
+        row_of = np.array([rows.get((key[0], key[1], int(key[2])), -1) for key in uniques], dtype=np.int64)
+        row = row_of[codes] if len(codes) else np.empty(0, dtype=np.int64)
+
+        # Dias da matriz: os já incorporados e os novos
+        old_days = np.empty(0, dtype='datetime64[D]') if rebuild else self.days
+        origin = first_day if rebuild else old_days[0]
+        last_day = dates[-1].astype('datetime64[D]')
+        days = np.arange(origin, last_day + ONE_DAY, ONE_DAY)
+        day = ((dates[start:].astype('datetime64[D]') - origin) // ONE_DAY).astype(np.int64)
+
+        # Soma dos tamanhos de cada (série, dia) a partir do primeiro dia modificado
+        sums = np.zeros((len(key_list), len(days) - first_col))
+        counts = np.zeros(sums.shape, dtype=np.int64)
+        valid = row >= 0
+        sizes_new = frame['Tamanho do Download (KB)'].to_numpy(dtype=np.float64)[valid]
+        np.add.at(sums, (row[valid], day[valid] - first_col), sizes_new)
+        np.add.at(counts, (row[valid], day[valid] - first_col), 1)
+        block = np.where(counts > 0, sums, np.nan)
+
+        sizes = np.full((len(key_list), len(days)), np.nan)
+        median = np.full(sizes.shape, np.nan)
+        mad = np.full(sizes.shape, np.nan)
+        if not rebuild:
+            nrows = len(self.keys)
+            sizes[:nrows, :first_col] = self.sizes[:, :first_col]
+            median[:nrows, :first_col] = self.median[:, :first_col]
+            mad[:nrows, :first_col] = self.mad[:, :first_col]
+        sizes[:, first_col:] = block
+
+        # Estatísticas móveis recalculadas apenas a partir do primeiro dia modificado; o MAD de cada dia
+        # depende das medianas dos dias anteriores, de modo que são utilizadas duas janelas
+        lo = max(first_col - 2 * self.window, 0)
+        median_block, mad_block = _rolling(sizes[:, lo:], self.window)
+        median[:, first_col:] = median_block[:, first_col - lo:]
+        mad[:, first_col:] = mad_block[:, first_col - lo:]
+
+        self.keys, self.rows, self.days = key_list, rows, days
+        self.sizes, self.median, self.mad = sizes, median, mad
+        self.offsets = np.searchsorted(dates, days.astype(dates.dtype), side='left')
+        self.last = dates[-1]
+
+    def _select(self, otypes, ftypes, hour_mask, start_date, end_date):
+        """Linhas (séries) e colunas (dias) da matriz que atendem aos filtros."""
+        hours = set(maskHours(hour_mask))
+        otypes, ftypes = set(otypes), set(ftypes)
+        rows = np.array([i for i, (otype, ftype, hour) in enumerate(self.keys)
+                         if otype in otypes and ftype in ftypes and hour in hours], dtype=np.int64)
+        lo = np.searchsorted(self.days, np.datetime64(pd.Timestamp(start_date).normalize(), 'D'), side='left')
+        hi = np.searchsorted(self.days, np.datetime64(pd.Timestamp(end_date).normalize(), 'D'), side='right')
+        return rows, slice(lo, hi)
+
+    def _frame(self, rows, cols, mask, columns):
+        series, day = np.nonzero(mask)
+        keys = [self.keys[i] for i in rows[series]]
+        dates = self.days[cols][day].astype('datetime64[ns]') + np.array([key[2] for key in keys], dtype='timedelta64[h]')
+        dfs = pd.DataFrame({
+            'Data da Observação': dates,
+            'Tipo de Observação': [key[0] for key in keys],
+            'Tipo de Arquivo': [key[1] for key in keys],
+            'Horário Sinótico': np.array([key[2] for key in keys], dtype=np.int64),
+        })
+        for name, values in columns.items():
+            dfs[name] = values[series, day]
+        return dfs.sort_values(['Data da Observação', 'Tipo de Observação', 'Tipo de Arquivo'], kind='stable',
+                               ignore_index=True)
+
+    def missing(self, otypes, ftypes, hour_mask, start_date, end_date):
+        """Ciclos sem arquivo no período, a partir do primeiro arquivo de cada série e até o último ciclo do inventário."""
+        with self._lock:
+            rows, cols = self._select(otypes, ftypes, hour_mask, start_date, end_date)
+            sizes = self.sizes[rows]
+            present = ~np.isnan(sizes)
+            # Dias anteriores ao primeiro arquivo de cada série não são considerados ausentes
+            started = np.maximum.accumulate(present, axis=1)[:, cols]
+            times = (self.days[cols].astype('datetime64[ns]')[None, :] +
+                     np.array([self.keys[i][2] for i in rows], dtype='timedelta64[h]')[:, None])
+            # Ciclos posteriores ao último ciclo do inventário ainda não são considerados ausentes
+            last = np.datetime64('NaT') if self.last is None else self.last
+            mask = ~present[:, cols] & started & (times <= last)
+            return self._frame(rows, cols, mask, {})
+
+    def outliers(self, otypes, ftypes, hour_mask, start_date, end_date):
+        """Arquivos muito menores do que a mediana dos dias anteriores ou muito distantes dela."""
+        with self._lock:
+            rows, cols = self._select(otypes, ftypes, hour_mask, start_date, end_date)
+            sizes, median, mad = self.sizes[rows, cols], self.median[rows, cols], self.mad[rows, cols]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                low = sizes < self.drop_ratio * median
+                far = (mad > 0) & (np.abs(sizes - median) > self.threshold * MAD_SCALE * mad)
+            mask = (low | far) & ~np.isnan(sizes)
+            return self._frame(rows, cols, mask, {'Tamanho do Download (KB)': sizes, 'Mediana (KB)': median})
+
+    def dailyTotals(self, otypes, ftypes, hour_mask, start_date, end_date):
+        """Tamanho total de cada dia do período (soma de todas as séries escolhidas)."""
+        with self._lock:
+            rows, cols = self._select(otypes, ftypes, hour_mask, start_date, end_date)
+            totals = np.nansum(self.sizes[rows, cols], axis=0)
+            return pd.Series(totals, index=pd.DatetimeIndex(self.days[cols].astype('datetime64[ns]')),
+                             name='Tamanho do Download (KB)')
+
+
+def forecastStorage(daily, horizon=365, method='linear', initial=0.0):
+    """Previsão do total acumulado a partir do total diário (``daily``, indexado pelos dias).
+
+    O acumulado parte de ``initial`` (o total já armazenado antes do primeiro
+    dia de ``daily``). A tendência do total diário é ajustada por mínimos quadrados; com
+    ``method='seasonal'`` (e pelo menos um ano de dados), é acrescentado o
+    desvio médio de cada mês do ano em relação à tendência. Retorna o
+    acumulado observado e o previsto ('Acumulado' e 'Previsão').
+    """
+    cumulative = initial + daily.cumsum()
+    if len(daily) < 2:
+        return pd.DataFrame({'Acumulado': cumulative, 'Previsão': np.nan})
+
+    t = np.arange(len(daily), dtype=np.float64)
+    slope, intercept = np.polyfit(t, daily.to_numpy(dtype=np.float64), 1)
+    future = pd.date_range(daily.index[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    increments = intercept + slope * np.arange(len(daily), len(daily) + horizon)
+
+    if method == 'seasonal' and len(daily) >= 365:
+        residuals = daily - (intercept + slope * t)
+        profile = residuals.groupby(daily.index.month).mean()
+        increments = increments + profile.reindex(future.month).fillna(0.0).to_numpy()
+
+    forecast = cumulative.iloc[-1] + np.cumsum(np.clip(increments, 0, None))
+    observed = pd.DataFrame({'Acumulado': cumulative, 'Previsão': np.nan})
+    # A previsão começa no último valor observado (linha contínua no gráfico)
+    observed.iloc[-1, 1] = cumulative.iloc[-1]
+    return pd.concat([observed, pd.DataFrame({'Acumulado': np.nan, 'Previsão': forecast}, index=future)])
+
+
+def fillDate(forecast, capacity):
+    """Primeiro dia em que o total acumulado (observado ou previsto) atinge ``capacity`` (ou None)."""
+    total = forecast['Acumulado'].fillna(forecast['Previsão'])
+    full = np.flatnonzero(total.to_numpy() >= capacity)
+    return None if len(full) == 0 else forecast.index[full[0]]
+
+
+_analytics = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def analyticsFor(windowed):
+    """SeriesAnalytics de um inventário (armobs.dataset.WindowedDataset), compartilhada pelo processo."""
+    with _lock:
+        analytics = _analytics.get(windowed)
+        if analytics is None:
+            analytics = _analytics[windowed] = SeriesAnalytics()
+    return analytics
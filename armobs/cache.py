@@ -0,0 +1,77 @@
+# Cache de resultados utilizado pelo dashboard
+
+import sys
+import threading
+from collections import OrderedDict
+
+
+def nbytes(value):
+    """Memória (aproximada, em bytes) ocupada por um resultado (dataframe, série ou array)."""
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Cache LRU (least recently used) limitado pelo número de itens e, opcionalmente, pelo tamanho.
+
+    Com ``maxbytes``, os itens utilizados há mais tempo também são removidos
+    quando a soma dos tamanhos (calculados com ``sizeof``) ultrapassa o limite.
+    As operações são protegidas por um lock, de modo que o cache pode ser
+    compartilhado entre as sessões do servidor.
+    """
+
+    def __init__(self, maxsize=32, maxbytes=None, sizeof=nbytes):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            self._discard(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            # Remove os itens utilizados há mais tempo (mantendo ao menos o item inserido)
+            while len(self._data) > 1 and (
+                    (self.maxsize is not None and len(self._data) > self.maxsize) or
+                    (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+                self._discard(next(iter(self._data)))
+
+    def _discard(self, key):
+        if key in self._data:
+            del self._data[key]
+            self.nbytes -= self._sizes.pop(key)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
@@ -0,0 +1,234 @@
+# Coleta do inventário dos arquivos de observação (substitui o get_inventory.sh)
+#
+# Os diretórios das observações de cada ciclo são percorridos em paralelo com
+# os.scandir (sem processos externos como ls, grep, awk ou sed) e os nomes dos
+# arquivos (gdas.tHHz.<otype>...) são interpretados em uma única passagem. O
+# horário de início do GSI ("STARTING DATE-TIME") é lido apenas do início do
+# log mais recente de cada ciclo (armobs.gsilog). O resultado é escrito
+# diretamente no formato do mon_rec_obs_final.csv.
+#
+# Os ciclos são processados em lotes, em ordem cronológica; ao final de cada
+# lote as linhas são acrescentadas ao CSV e o último ciclo concluído é
+# registrado em um checkpoint. Com a opção --incremental, a coleta continua a
+# partir do checkpoint (retomando uma execução interrompida ou processando
+# apenas os ciclos novos desde a última execução) ou, sem o checkpoint, a partir
+# do último ciclo registrado no CSV. Os últimos ciclos já coletados são
+# percorridos novamente (os arquivos gdas chegam depois dos arquivos gfs do
+# mesmo ciclo) e apenas os arquivos ainda não registrados são acrescentados.
+#
+# Uso:
+#
+#   python -m armobs.collector --obs /extra2/EGEON_PREPROC_BRUTOS \
+#       --logs /extra2/XC50_SMNA_GSI_dataout_preOper \
+#       --output mon_rec_obs_final.csv --incremental 2023010100
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from armobs.gsilog import GsiLogCache, gsiStart
+from armobs.ingest import DATE_COLUMNS, DUPLICATE_KEYS, LATE_CYCLES, InventoryStore
+
+# Organização dos diretórios das observações
+OBS_LAYOUTS = {
+    # /extra2/EGEON_PREPROC_BRUTOS/AAAA/MM/DD (um diretório por dia)
+    'egeon': os.path.join('{root}', '{date:%Y}', '{date:%m}', '{date:%d}'),
+    # /extra2/XC50_EXTERNAL/AAAAMMDDHH/dataout/NCEP (um diretório por ciclo)
+    'xc50': os.path.join('{root}', '{date:%Y%m%d%H}', 'dataout', 'NCEP'),
+}
+
+COLUMNS = ['Tamanho do Download (KB)', 'Data do Download', 'Fuso Horário', 'Nome do Arquivo',
+           'Início do Ciclo AD', 'Tipo de Arquivo', 'Horário Sinótico', 'Tipo de Observação',
+           'Data da Observação']
+
+# gdas.t00z.prepbufr.tm00.bufr_d -> ('gdas', '00', 'prepbufr')
+FILENAME_RE = re.compile(r'^(gdas|gfs)\.t(\d{2})z\.([^.]+)\.')
+
+CYCLE_FMT = '%Y%m%d%H'
+
+# Ciclos já coletados (até o último deles) percorridos novamente na coleta incremental
+RESCAN_CYCLES = LATE_CYCLES
+
+
+def parseCycle(cycle):
+    return datetime.strptime(str(cycle), CYCLE_FMT)
+
+
+def cycleRange(datai, dataf):
+    """Ciclos (de 6 em 6 horas) entre datai e dataf (inclusive)."""
+    cycles = []
+    date = datai
+    while date <= dataf:
+        cycles.append(date)
+        date += timedelta(hours=6)
+    return cycles
+
+
+def scanObsDir(path):
+    """Arquivos de observação de um diretório: lista de (nome, tamanho, mtime, partes do nome)."""
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                match = FILENAME_RE.match(entry.name)
+                if match is None or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_size, stat.st_mtime, match.groups()))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _formatMtime(mtime):
+    local = time.localtime(mtime)
+    return time.strftime('%Y-%m-%d %H:%M:%S', local), '{:+03d}'.format(local.tm_gmtoff // 3600)
+
+
+def collectCycles(cycles, obs_root, log_root=None, layout='egeon', workers=16, gsi_cache=None):
+    """Inventário (no formato do mon_rec_obs_final.csv) dos ciclos indicados.
+
+    ``gsi_cache`` (armobs.gsilog.GsiLogCache) evita a leitura dos logs do GSI já lidos.
+    """
+    template = OBS_LAYOUTS[layout]
+
+    # Ciclos que compartilham o mesmo diretório (e.g., um diretório por dia) o percorrem uma única vez
+    dirs = {}
+    for cycle in cycles:
+        dirs.setdefault(template.format(root=obs_root, date=cycle), {})[cycle.hour] = cycle
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scans = executor.map(scanObsDir, dirs)
+        starts = executor.map(lambda cycle: gsiStart(log_root, cycle, gsi_cache), cycles)
+        scans = dict(zip(dirs, scans))
+        starts = dict(zip(cycles, starts))
+
+    rows = []
+    for path, by_hour in dirs.items():
+        for name, size, mtime, (ftype, hour, otype) in scans[path]:
+            cycle = by_hour.get(int(hour))
+            if cycle is None:
+                continue
+            download, tz = _formatMtime(mtime)
+            rows.append((size, download, tz, name, starts[cycle], ftype, hour, otype,
+                         '{:%Y-%m-%d %H}:00:00'.format(cycle)))
+
+    dfs = pd.DataFrame(rows, columns=COLUMNS)
+    return dfs.sort_values(['Data da Observação', 'Nome do Arquivo'], kind='stable').reset_index(drop=True)
+
+
+def toInventoryFrame(dfs):
+    """Converte as colunas para os mesmos tipos obtidos com a leitura do CSV (armobs.ingest.readInventoryCsv)."""
+    dfs = dfs.copy()
+    for col in DATE_COLUMNS:
+        dfs[col] = pd.to_datetime(dfs[col])
+    for col in ['Fuso Horário', 'Horário Sinótico']:
+        dfs[col] = pd.to_numeric(dfs[col])
+    return dfs
+
+
+class Checkpoint:
+    """Último ciclo concluído da coleta, gravado em um arquivo JSON."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            last = json.load(f).get('last_cycle')
+        return None if last is None else parseCycle(last)
+
+    def save(self, cycle):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'last_cycle': '{:%Y%m%d%H}'.format(cycle)}, f)
+        os.replace(tmp, self.path)
+
+
+def recordedFiles(output):
+    """Arquivos (nome e data da observação, como no CSV) registrados no CSV ``output``."""
+    if not os.path.exists(output) or os.path.getsize(output) == 0:
+        return pd.DataFrame(columns=DUPLICATE_KEYS, dtype=str)
+    return pd.read_csv(output, usecols=DUPLICATE_KEYS, dtype=str)
+
+
+def collect(datai, dataf, obs_root, output, log_root=None, layout='egeon', incremental=False,
+            batch=120, workers=16, store=None, gsi_cache=None):
+    """Coleta os ciclos entre datai e dataf, acrescentando-os ao CSV ``output`` a cada lote.
+
+    Com ``incremental``, a coleta continua a partir do último ciclo concluído
+    (do checkpoint ou, sem ele, do CSV), percorrendo novamente os
+    RESCAN_CYCLES últimos ciclos; sem ``incremental``, o CSV é reescrito.
+    Retorna o número de linhas escritas.
+    """
+    checkpoint = Checkpoint(output + '.checkpoint.json')
+    recorded = set()
+    if incremental:
+        files = recordedFiles(output)
+        last = checkpoint.load()
+        if last is None and not files.empty:
+            last = datetime.fromisoformat(files['Data da Observação'].max())
+        if last is not None:
+            datai = max(datai, last - (RESCAN_CYCLES - 1) * timedelta(hours=6))
+            # Arquivos já registrados dos ciclos percorridos novamente
+            since = '{:%Y-%m-%d %H}:00:00'.format(datai)
+            files = files[files['Data da Observação'] >= since]
+            recorded = set(zip(files['Nome do Arquivo'], files['Data da Observação']))
+    elif os.path.exists(output):
+        os.remove(output)
+
+    cycles = cycleRange(datai, dataf)
+    written = 0
+    for i in range(0, len(cycles), batch):
+        dfs = collectCycles(cycles[i:i + batch], obs_root, log_root, layout, workers, gsi_cache)
+        if recorded:
+            new = [key not in recorded for key in zip(dfs['Nome do Arquivo'], dfs['Data da Observação'])]
+            dfs = dfs[new].reset_index(drop=True)
+        header = not os.path.exists(output) or os.path.getsize(output) == 0
+        dfs.to_csv(output, mode='a', header=header, index=False)
+        if store is not None and not dfs.empty:
+            store.append(toInventoryFrame(dfs))
+        if gsi_cache is not None:
+            gsi_cache.save()
+        checkpoint.save(cycles[min(i + batch, len(cycles)) - 1])
+        written += len(dfs)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Coleta o inventário dos arquivos de observação disponíveis para o SMNA.')
+    parser.add_argument('datai', help='primeiro ciclo (AAAAMMDDHH)')
+    parser.add_argument('dataf', nargs='?', default=None, help='último ciclo (AAAAMMDDHH; padrão: ciclo 00Z de hoje)')
+    parser.add_argument('--obs', required=True, help='diretório raiz das observações')
+    parser.add_argument('--logs', default=None, help='diretório raiz dos logs do GSI')
+    parser.add_argument('--layout', default='egeon', choices=sorted(OBS_LAYOUTS), help='organização dos diretórios das observações')
+    parser.add_argument('--output', default='mon_rec_obs_final.csv', help='arquivo CSV de saída')
+    parser.add_argument('--incremental', action='store_true', help='processa apenas os ciclos posteriores ao último ciclo concluído (e os últimos ciclos já coletados)')
+    parser.add_argument('--store', default=None, help='acrescenta também os novos ciclos às partições mensais (armobs.ingest)')
+    parser.add_argument('--batch', type=int, default=120, help='número de ciclos por lote (checkpoint)')
+    parser.add_argument('--workers', type=int, default=16, help='número de threads')
+    parser.add_argument('--gsi-cache', default=None, help='arquivo JSON com os horários de início do GSI já lidos (armobs.gsilog)')
+    args = parser.parse_args(argv)
+
+    datai = parseCycle(args.datai)
+    dataf = parseCycle(args.dataf) if args.dataf else datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+
+    store = None if args.store is None else InventoryStore(args.store)
+    gsi_cache = None if args.gsi_cache is None else GsiLogCache(args.gsi_cache)
+
+    written = collect(datai, dataf, args.obs, args.output, log_root=args.logs, layout=args.layout,
+                      incremental=args.incremental, batch=args.batch, workers=args.workers, store=store,
+                      gsi_cache=gsi_cache)
+    print('{} linhas escritas em {}'.format(written, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Inventário indexado e estruturas derivadas utilizadas pelo dashboard
+
+import threading
+
+from armobs import metrics
+from armobs.index import InventoryIndex
+from armobs.rollup import RollupCube
+from armobs.schema import compactInventory
+from armobs.selection import Selection
+
+
+class Dataset:
+    """Índice, seleção memoizada e cubo de agregação de um mesmo inventário."""
+
+    def __init__(self, dfs, maxsize=32, cache=None):
+        with metrics.stage('dataset.compact') as stage:
+            stage.rows = len(dfs)
+            dfs = compactInventory(dfs)
+        with metrics.stage('dataset.index') as stage:
+            stage.rows = len(dfs)
+            self.index = InventoryIndex(dfs)
+        self.frame = self.index.frame
+        self.selection = Selection(self.index, maxsize=maxsize, cache=cache)
+        with metrics.stage('dataset.rollup') as stage:
+            stage.rows = len(dfs)
+            self.rollup = RollupCube(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class WindowedDataset:
+    """Dataset construído apenas com as partições que cobrem os períodos já consultados.
+
+    ``inventory`` é um armobs.ingest.InventoryStore (ou CsvInventory). As
+    partições são carregadas à medida que o período escolhido se estende
+    para meses ainda não lidos. O Dataset atual é substituído (e não
+    modificado) quando novas partições são carregadas, de modo que pode ser
+    utilizado por várias sessões ao mesmo tempo.
+    """
+
+    def __init__(self, inventory, drop=('Nome do Arquivo',), maxsize=32, cache=None):
+        self.inventory = inventory
+        self.drop = list(drop)
+        self.maxsize = maxsize
+        self.cache = cache
+        self.months = set()
+        self.dataset = None
+        # Incrementada quando o inventário recebe novos ciclos (refresh)
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def _load(self, months):
+        dfs = self.inventory.loadMonths(months).drop(self.drop, axis=1, errors='ignore')
+        self.dataset = Dataset(dfs, maxsize=self.maxsize, cache=self.cache)
+        self.months = months
+
+    def cover(self, start_date, end_date):
+        """Dataset que contém (pelo menos) o período [start_date, end_date]."""
+        months = set(self.inventory.months(start_date, end_date))
+        dataset = self.dataset
+        if dataset is not None and months <= self.months:
+            return dataset
+
+        with self._lock:
+            if self.dataset is None or not months <= self.months:
+                self._load(months | self.months)
+            return self.dataset
+
+    def refresh(self):
+        """Lê as atualizações do inventário e, se houver, substitui o Dataset; retorna o número de linhas novas.
+
+        Os meses já carregados são lidos novamente, junto com os meses
+        posteriores ao último deles (novos ciclos).
+        """
+        with self._lock:
+            rows = self.inventory.refresh()
+            if rows:
+                if self.dataset is not None:
+                    newest = max(self.months)
+                    self._load(self.months | {month for month in self.inventory.months() if month > newest})
+                self.version += 1
+            return rows
@@ -0,0 +1,79 @@
+# Redução do número de pontos das séries temporais enviadas ao navegador
+#
+# As séries são reduzidas para aproximadamente a resolução da tela, mantendo
+# os picos (e.g., um arquivo truncado ou muito maior do que o habitual):
+#
+# * minmax: para cada intervalo, mantém os pontos de mínimo e de máximo;
+# * lttb: Largest-Triangle-Three-Buckets (Steinarsson, 2013), que escolhe em
+#   cada intervalo o ponto que forma o maior triângulo com o ponto escolhido
+#   no intervalo anterior e com a média do intervalo seguinte.
+#
+# As funções retornam os índices (em ordem crescente) dos pontos mantidos.
+
+import numpy as np
+
+
+def _asFloat(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').view(np.int64)
+    return values.astype(np.float64)
+
+
+def minmax(x, y, n):
+    """Índices dos mínimos e máximos de ``n // 2`` intervalos (além do primeiro e do último ponto)."""
+    size = len(y)
+    nbins = n // 2
+    if size <= n or nbins < 1:
+        return np.arange(size)
+
+    y = _asFloat(y)
+    starts = np.linspace(0, size, nbins + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(nbins), np.diff(np.append(starts, size)))
+
+    keep = [np.array([0, size - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        candidates = np.flatnonzero(y == extreme[bucket])
+        # Primeira ocorrência do extremo em cada intervalo
+        _, first = np.unique(bucket[candidates], return_index=True)
+        keep.append(candidates[first])
+
+    return np.unique(np.concatenate(keep))
+
+
+def lttb(x, y, n):
+    """Índices dos ``n`` pontos escolhidos pelo algoritmo LTTB."""
+    size = len(y)
+    if size <= n or n < 3:
+        return np.arange(size)
+
+    x = _asFloat(x)
+    y = _asFloat(y)
+
+    # n - 2 intervalos entre o primeiro e o último ponto
+    bounds = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x[:-1], bounds[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], bounds[:-1]) / counts
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    index = np.empty(n, dtype=np.int64)
+    index[0], index[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        index[i + 1] = a
+    return index
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+def downsample(x, y, n, method='lttb'):
+    """Índices dos pontos mantidos ao reduzir a série (x, y) para cerca de ``n`` pontos."""
+    return METHODS[method](x, y, n)
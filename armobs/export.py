@@ -0,0 +1,125 @@
+# Exportação da seleção do inventário (CSV, Parquet ou Arrow)
+#
+# A seleção é exportada em blocos de linhas (armobs.sources.SourceRegistry.chunks):
+# cada bloco é convertido e escrito antes de o próximo ser extraído do
+# inventário, de modo que nem a seleção completa nem o arquivo exportado
+# precisam estar inteiros na memória. Os blocos escritos podem ser enviados
+# à medida que são produzidos (e.g., pelas rotas /export e /query do
+# armobs.server, utilizadas pelo botão de exportação do dashboard quando o
+# plugin está carregado) ou reunidos em um único arquivo (botão de download
+# do dashboard no navegador ou sem o plugin). O pyarrow (Parquet e Arrow) é importado apenas quando utilizado;
+# no navegador, apenas o CSV está disponível.
+
+import io
+from urllib.parse import urlencode
+
+import pandas as pd
+
+# Linhas de cada bloco escrito
+CHUNK_ROWS = 100_000
+
+# Formatos disponíveis: tipo MIME e extensão do arquivo
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Arquivo em que o pyarrow escreve os blocos, esvaziado após cada bloco (``drain``)."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Posição desde o início do arquivo (utilizada no rodapé do Parquet)
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _schema(pa, dfs):
+    schema = pa.Schema.from_pandas(dfs, preserve_index=False)
+    # Colunas sem valores no primeiro bloco (e.g., sem o log do GSI) são exportadas como texto
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def writeChunks(chunks, fmt='csv'):
+    """Converte os blocos (DataFrames com as mesmas colunas) para o formato ``fmt``, um bloco por vez.
+
+    Retorna um gerador de bytes; a concatenação dos bytes é o arquivo completo.
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Formato desconhecido: {} (utilize {})'.format(fmt, ', '.join(FORMATS)))
+    if fmt == 'csv':
+        return _csvChunks(chunks)
+    return _arrowChunks(chunks, fmt)
+
+
+def _csvChunks(chunks):
+    header = True
+    for dfs in chunks:
+        yield dfs.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+def _arrowChunks(chunks, fmt):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = schema = None
+    for dfs in chunks:
+        if writer is None:
+            schema = _schema(pa, dfs)
+            writer = pq.ParquetWriter(sink, schema) if fmt == 'parquet' else pa.ipc.new_stream(sink, schema)
+        writer.write_table(pa.Table.from_pandas(dfs, schema=schema, preserve_index=False))
+        yield sink.drain()
+    if writer is None:
+        # Seleção vazia: arquivo sem linhas (e sem colunas)
+        schema = pa.schema([])
+        writer = pq.ParquetWriter(sink, schema) if fmt == 'parquet' else pa.ipc.new_stream(sink, schema)
+    writer.close()
+    yield sink.drain()
+
+
+def exportFile(chunks, fmt='csv'):
+    """Arquivo (em memória) com os blocos convertidos para o formato ``fmt``."""
+    output = io.BytesIO()
+    for data in writeChunks(chunks, fmt):
+        output.write(data)
+    output.seek(0)
+    return output
+
+
+def exportName(date_range, fmt='csv', prefix='armobs'):
+    """Nome do arquivo exportado (e.g., armobs_20230301-20230502.csv)."""
+    start_date, end_date = date_range
+    return '{}_{:%Y%m%d}-{:%Y%m%d}.{}'.format(prefix, pd.Timestamp(start_date), pd.Timestamp(end_date),
+                                              FORMATS[fmt][1])
+
+
+def exportQuery(names, otypes, ftypes, hours, date_range, fmt='csv'):
+    """Parâmetros da rota /export (armobs.server) correspondentes à seleção dos widgets do dashboard."""
+    start_date, end_date = date_range
+    return urlencode({'source': ','.join(names), 'otype': ','.join(otypes), 'ftype': ','.join(ftypes),
+                      'hour': ','.join(hours), 'start': pd.Timestamp(start_date).isoformat(),
+                      'end': pd.Timestamp(end_date).isoformat(), 'format': fmt})
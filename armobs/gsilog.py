@@ -0,0 +1,162 @@
+# Horário de início do GSI registrado nos logs de cada ciclo
+#
+# O início do ciclo de assimilação ('Início do Ciclo AD') é obtido da linha
+# "STARTING DATE-TIME" do log mais recente do GSI de cada ciclo
+# (gsiStdout_AAAAMMDDHH.runTime-*.log), com a data registrada na própria linha
+# (o GSI de um ciclo pode iniciar no dia seguinte ao do horário sinótico). Os logs são mapeados em memória
+# (mmap) e percorridos apenas até a primeira ocorrência da linha, que fica no
+# início do arquivo; apenas as páginas lidas são carregadas do disco. Se o
+# mapeamento não for possível, é feita uma leitura limitada do início do
+# arquivo.
+#
+# Os resultados são guardados por log, identificado pelo dispositivo, inode,
+# data de modificação e tamanho (GsiLogCache, opcionalmente gravado em um
+# arquivo JSON), de modo que uma nova varredura (e.g., a cada ciclo) lê
+# apenas os logs novos ou modificados (veja a opção --gsi-cache do
+# armobs.collector).
+
+import json
+import mmap
+import os
+import threading
+from datetime import datetime
+
+from armobs import metrics
+
+LOG_LAYOUT = os.path.join('{root}', '{date:%Y%m%d%H}')
+
+GSI_START = b'STARTING DATE-TIME'
+
+
+def newestGsiLog(path, cycle):
+    """Log do GSI mais recente (gsiStdout_AAAAMMDDHH.runTime-*.log) do ciclo, ou None."""
+    prefix = 'gsiStdout_{:%Y%m%d%H}.runTime-'.format(cycle)
+    newest, newest_mtime = None, None
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not (entry.name.startswith(prefix) and entry.name.endswith('.log')):
+                    continue
+                mtime = entry.stat().st_mtime
+                if newest_mtime is None or mtime > newest_mtime:
+                    newest, newest_mtime = entry.path, mtime
+    except FileNotFoundError:
+        pass
+    return newest
+
+
+def parseStartLine(line):
+    """Data e horário ('AAAA-MM-DD HH:MM:SS') da linha "STARTING DATE-TIME" (sem a fração de segundo), ou None."""
+    # e.g., "STARTING DATE-TIME  JAN 01,2023  17:03:09.123  001  SUN   2459946"
+    fields = line.decode('ascii', 'replace').split()
+    if len(fields) <= 4:
+        return None
+    try:
+        start = datetime.strptime(' '.join(fields[2:4] + [fields[4].split('.')[0]]), '%b %d,%Y %H:%M:%S')
+    except ValueError:
+        return None
+    return start.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _findStartMmap(f, max_bytes):
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pos = data.find(GSI_START, 0, max_bytes)
+        if pos < 0:
+            return None
+        end = data.find(b'\n', pos)
+        return parseStartLine(data[pos:end if end >= 0 else len(data)])
+
+
+def _findStartHead(f, max_bytes, chunk_size):
+    data = bytearray()
+    pos = -1
+    while len(data) < max_bytes:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        # Apenas o trecho novo (e o final do anterior) é percorrido
+        start = max(len(data) - len(GSI_START), 0)
+        data += chunk
+        if pos < 0:
+            pos = data.find(GSI_START, start)
+        # A linha precisa estar completa para ser interpretada
+        if pos >= 0 and data.find(b'\n', pos) >= 0:
+            return parseStartLine(bytes(data[pos:data.find(b'\n', pos)]))
+    return None if pos < 0 else parseStartLine(bytes(data[pos:]))
+
+
+def readGsiStart(path, max_bytes=16 * 1024 * 1024, chunk_size=65536):
+    """Data e horário da linha "STARTING DATE-TIME", lendo o log apenas até a primeira ocorrência."""
+    with open(path, 'rb') as f:
+        try:
+            return _findStartMmap(f, max_bytes)
+        except (ValueError, OSError):
+            # Arquivos vazios ou sistemas de arquivos sem suporte a mmap
+            f.seek(0)
+            return _findStartHead(f, max_bytes, chunk_size)
+
+
+class GsiLogCache:
+    """Inícios do GSI já lidos, por log (dispositivo, inode, data de modificação e tamanho).
+
+    As chaves têm o prefixo ``VERSION``: as entradas gravadas com outro
+    formato (e.g., apenas o horário, sem a data) são lidas novamente.
+    """
+
+    VERSION = 'v2'
+
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.changed = False
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.entries = {key: start for key, start in json.load(f).items()
+                                if key.startswith(self.VERSION + ':')}
+
+    @staticmethod
+    def key(stat):
+        return '{}:{}:{}:{}:{}'.format(GsiLogCache.VERSION, stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def start(self, log):
+        """Início do GSI registrado no log (lido apenas se o log for novo ou tiver sido modificado)."""
+        stat = os.stat(log)
+        if stat.st_size == 0:
+            return None
+        key = self.key(stat)
+        with self._lock:
+            if key in self.entries:
+                metrics.increment('gsilog.cached')
+                return self.entries[key]
+        with metrics.stage('gsilog.read'):
+            start = readGsiStart(log)
+        with self._lock:
+            self.entries[key] = start
+            self.changed = True
+        return start
+
+    def save(self):
+        if self.path is None or not self.changed:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+        self.changed = False
+
+
+def gsiStart(log_root, cycle, cache=None):
+    """Início do ciclo AD ('AAAA-MM-DD HH:MM:SS') registrado no log do GSI, ou None."""
+    if log_root is None:
+        return None
+    log = newestGsiLog(LOG_LAYOUT.format(root=log_root, date=cycle), cycle)
+    if log is None:
+        return None
+    if cache is not None:
+        start = cache.start(log)
+    else:
+        start = readGsiStart(log) if os.path.getsize(log) > 0 else None
+    return start
+
@@ -0,0 +1,113 @@
+# Índice do inventário construído no momento da carga dos dados
+#
+# O inventário é ordenado pela data da observação e as linhas de cada
+# combinação (tipo de observação, tipo de arquivo, horário sinótico) são
+# guardadas em arrays de posições. Um período passa a ser um par de buscas
+# binárias (searchsorted) em cada combinação escolhida e a seleção custa
+# proporcionalmente ao número de linhas selecionadas, e não ao tamanho do
+# inventário.
+
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from armobs.synoptic import maskHours
+
+
+def toDatetime64(date, dtype):
+    """Converte uma data (datetime, Timestamp ou string) para o tipo datetime64 do índice."""
+    return pd.Timestamp(date).to_datetime64().astype(dtype)
+
+
+class InventoryIndex:
+    """Inventário ordenado pela data da observação e indexado por (otype, ftype, hora)."""
+
+    def __init__(self, dfs):
+        # O inventário normalmente já está em ordem cronológica (não é copiado)
+        if not dfs['Data da Observação'].is_monotonic_increasing:
+            dfs = dfs.sort_values('Data da Observação', kind='stable')
+
+        # A data da observação é apresentada como a primeira coluna da tabela
+        columns = ['Data da Observação'] + [col for col in dfs.columns if col != 'Data da Observação']
+        frame = dfs[columns]
+        frame.index = pd.RangeIndex(len(frame))
+
+        for col in ['Tipo de Observação', 'Tipo de Arquivo', 'Horário Sinótico']:
+            if not isinstance(frame[col].dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype('category')
+
+        self.frame = frame
+        self.dates = frame['Data da Observação'].to_numpy()
+        self.hours = frame['Data da Observação'].dt.hour.to_numpy(dtype=np.int8)
+
+        self.otypes = list(frame['Tipo de Observação'].cat.categories)
+        self.ftypes = list(frame['Tipo de Arquivo'].cat.categories)
+        otype_codes = frame['Tipo de Observação'].cat.codes.to_numpy()
+        ftype_codes = frame['Tipo de Arquivo'].cat.codes.to_numpy()
+
+        # Identificador da combinação de cada linha; a ordenação estável mantém
+        # as posições de cada combinação em ordem cronológica
+        group_id = ((otype_codes.astype(np.int64) + 1) * (len(self.ftypes) + 1) + ftype_codes + 1) * 24 + self.hours
+        order = np.argsort(group_id, kind='stable')
+        group_id = group_id[order]
+        bounds = np.flatnonzero(np.diff(group_id)) + 1
+
+        self.groups = {}
+        self.groupDates = {}
+        for offsets in np.split(order, bounds):
+            row = offsets[0] if len(offsets) else None
+            # Linhas sem tipo de observação ou de arquivo não são indexadas
+            if row is None or otype_codes[row] < 0 or ftype_codes[row] < 0:
+                continue
+            key = (self.otypes[otype_codes[row]], self.ftypes[ftype_codes[row]], int(self.hours[row]))
+            self.groups[key] = offsets
+            self.groupDates[key] = self.dates[offsets]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def dateBounds(self):
+        """Primeira e última datas de observação do inventário."""
+        if len(self.dates) == 0:
+            return None, None
+        return pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+
+    def groupSlices(self, otypes, ftypes, hour_mask, start_date, end_date):
+        """Intervalos [lo, hi) do período em cada combinação (otype, ftype, hora) escolhida.
+
+        Os horários sinóticos são informados como uma máscara de bits
+        (armobs.synoptic.hourMask).
+        """
+        start = toDatetime64(start_date, self.dates.dtype)
+        end = toDatetime64(end_date, self.dates.dtype)
+
+        for key in product(otypes, ftypes, maskHours(hour_mask)):
+            group_dates = self.groupDates.get(key)
+            if group_dates is None:
+                continue
+            lo = group_dates.searchsorted(start, side='left')
+            hi = group_dates.searchsorted(end, side='right')
+            if hi > lo:
+                yield key, lo, hi
+
+    def rows(self, otypes, ftypes, hour_mask, start_date, end_date):
+        """Posições (em ordem cronológica) das linhas que atendem aos filtros."""
+        parts = [self.groups[key][lo:hi]
+                 for key, lo, hi in self.groupSlices(otypes, ftypes, hour_mask, start_date, end_date)]
+
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+
+        rows = np.concatenate(parts)
+        rows.sort()
+        return rows
+
+    def take(self, rows):
+        """Dataframe com as linhas indicadas, numeradas a partir de zero."""
+        dfsp = self.frame.take(rows)
+        dfsp.index = pd.RangeIndex(len(dfsp))
+        return dfsp
+
+    def select(self, otypes, ftypes, hour_mask, start_date, end_date):
+        return self.take(self.rows(otypes, ftypes, hour_mask, start_date, end_date))
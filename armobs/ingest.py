@@ -0,0 +1,347 @@
+# Ingestão incremental do inventário em um armazenamento colunar local
+#
+# O CSV produzido pelo get_inventory.sh (mon_rec_obs_final.csv) é convertido em
+# partições mensais no formato Parquet (e.g., inventario/2023-10.parquet). A
+# cada execução apenas os ciclos posteriores ao último ciclo armazenado (e os
+# arquivos que chegaram atrasados aos ciclos mais recentes) são acrescentados, e
+# o dashboard lê apenas as partições dos meses cobertos pelo período escolhido.
+#
+# Uso:
+#
+#   python -m armobs.ingest mon_rec_obs_final.csv inventario/
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+from armobs import metrics
+
+INVENTORY_URL = 'https://raw.githubusercontent.com/GAD-DIMNT-CPTEC/SMNA-Dashboard-ArmObs/main/mon_rec_obs_final.csv'
+
+DATE_COLUMNS = ['Data do Download', 'Data da Observação']
+
+# Ciclos anteriores ao último ciclo armazenado cujas linhas novas ainda são
+# aceitas: os arquivos gdas chegam depois dos arquivos gfs do mesmo ciclo e
+# podem ser registrados no CSV depois de ciclos mais recentes
+LATE_CYCLES = 8
+
+CYCLE_STEP = pd.Timedelta(hours=6)
+
+# Identificam um arquivo do inventário (o mesmo nome se repete em outros dias)
+DUPLICATE_KEYS = ['Nome do Arquivo', 'Data da Observação']
+
+
+def readInventoryCsv(source, **kwargs):
+    """Lê o CSV do inventário (caminho local ou URL)."""
+    kwargs.setdefault('header', [0])
+    return pd.read_csv(source, parse_dates=DATE_COLUMNS, **kwargs)
+
+
+def isUrl(source):
+    return str(source).startswith(('http://', 'https://'))
+
+
+def monthName(date):
+    return pd.Timestamp(date).strftime('%Y-%m')
+
+
+def writeAtomic(path, write):
+    """Escreve ``path`` com ``write(tmp)`` em um arquivo temporário, substituído ao final."""
+    tmp = path + '.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class InventoryStore:
+    """Partições mensais (Parquet) do inventário e o seu manifesto."""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifestPath = os.path.join(root, 'manifest.json')
+        self.loadManifest()
+
+    def loadManifest(self):
+        try:
+            self.manifestMtime = os.stat(self.manifestPath).st_mtime_ns
+        except FileNotFoundError:
+            self.manifestMtime = None
+            self.manifest = {'watermark': None, 'partitions': {}, 'sources': {}}
+            return
+        with open(self.manifestPath) as f:
+            self.manifest = json.load(f)
+
+    def rows(self):
+        return sum(partition['rows'] for partition in self.manifest['partitions'].values())
+
+    def refresh(self):
+        """Relê o manifesto, se ele foi modificado (e.g., pelo python -m armobs.ingest); retorna o número de linhas novas."""
+        try:
+            mtime = os.stat(self.manifestPath).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        if mtime == self.manifestMtime:
+            return 0
+        rows = self.rows()
+        self.loadManifest()
+        return self.rows() - rows
+
+    def partitionPath(self, month):
+        return os.path.join(self.root, month + '.parquet')
+
+    def watermark(self):
+        """Data da observação do último ciclo armazenado."""
+        watermark = self.manifest['watermark']
+        return None if watermark is None else pd.Timestamp(watermark)
+
+    def bounds(self):
+        """Primeira e última datas de observação armazenadas."""
+        partitions = sorted(self.manifest['partitions'])
+        if not partitions:
+            return None, None
+        return pd.Timestamp(self.manifest['partitions'][partitions[0]]['start']), self.watermark()
+
+    def months(self, start_date=None, end_date=None):
+        """Partições (meses) que cobrem o período [start_date, end_date]."""
+        first = None if start_date is None else monthName(start_date)
+        last = None if end_date is None else monthName(end_date)
+        return [month for month in sorted(self.manifest['partitions'])
+                if (first is None or month >= first) and (last is None or month <= last)]
+
+    def readPartition(self, month):
+        return pd.read_parquet(self.partitionPath(month))
+
+    def load(self, start_date=None, end_date=None):
+        """Lê apenas as partições que cobrem o período (ou todas, se não informado)."""
+        return self.loadMonths(self.months(start_date, end_date))
+
+    def loadMonths(self, months):
+        with metrics.stage('inventory.load') as stage:
+            frames = [self.readPartition(month) for month in sorted(months)]
+            if not frames:
+                return pd.DataFrame(columns=list(self.manifest.get('columns', [])))
+            dfs = pd.concat(frames, ignore_index=True)
+            stage.rows = len(dfs)
+        return dfs
+
+    def append(self, dfs):
+        """Acrescenta as linhas novas dos ciclos posteriores ao último ciclo armazenado e dos LATE_CYCLES
+        ciclos anteriores a ele (linhas já armazenadas são ignoradas); retorna o número de linhas novas.
+        """
+        watermark = self.watermark()
+        if watermark is not None:
+            dfs = dfs.loc[dfs['Data da Observação'] > watermark - LATE_CYCLES * CYCLE_STEP]
+        if dfs.empty:
+            return 0
+
+        os.makedirs(self.root, exist_ok=True)
+        keys = DUPLICATE_KEYS if all(key in dfs.columns for key in DUPLICATE_KEYS) else None
+        dfs = dfs.sort_values('Data da Observação', kind='stable').drop_duplicates(keys)
+        months = dfs['Data da Observação'].dt.strftime('%Y-%m')
+
+        # Apenas as partições dos meses que receberam linhas novas são reescritas
+        appended = 0
+        for month, part in dfs.groupby(months, sort=True):
+            path = self.partitionPath(month)
+            stored = 0
+            if month in self.manifest['partitions'] and os.path.exists(path):
+                old = self.readPartition(month)
+                stored = len(old)
+                part = pd.concat([old, part], ignore_index=True).drop_duplicates(keys)
+                if len(part) == stored:
+                    continue
+                part = part.sort_values('Data da Observação', kind='stable')
+            part = part.reset_index(drop=True)
+            writeAtomic(path, lambda tmp: part.to_parquet(tmp, index=False))
+            self.manifest['partitions'][month] = {
+                'rows': len(part),
+                'start': str(part['Data da Observação'].iloc[0]),
+                'end': str(part['Data da Observação'].iloc[-1]),
+            }
+            appended += len(part) - stored
+
+        if appended:
+            last = dfs['Data da Observação'].iloc[-1]
+            self.manifest['watermark'] = str(last if watermark is None else max(watermark, last))
+            self.manifest['columns'] = list(dfs.columns)
+            self.saveManifest()
+        return appended
+
+    def saveManifest(self):
+        def write(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+        writeAtomic(self.manifestPath, write)
+        self.manifestMtime = os.stat(self.manifestPath).st_mtime_ns
+
+
+def ingestCsv(source, store):
+    """Acrescenta ao armazenamento os ciclos novos do CSV ``source``.
+
+    As linhas já lidas de uma mesma origem (registradas no manifesto) não são
+    interpretadas novamente, uma vez que o CSV apenas cresce ao final.
+    """
+    rows_read = store.manifest['sources'].get(source, 0)
+    dfs = readInventoryCsv(source, skiprows=range(1, rows_read + 1))
+    appended = store.append(dfs)
+    store.manifest['sources'][source] = rows_read + len(dfs)
+    store.saveManifest()
+    return appended
+
+
+class MemoryInventory:
+    """Inventário mantido integralmente em memória, com a mesma interface do InventoryStore."""
+
+    def __init__(self, dfs):
+        self.dfs = dfs
+        self._bounds = None
+
+    def bounds(self):
+        if self._bounds is None:
+            dates = self.dfs['Data da Observação']
+            self._bounds = (None, None) if dates.empty else (dates.min(), dates.max())
+        return self._bounds
+
+    def months(self, start_date=None, end_date=None):
+        return ['*']
+
+    def load(self, start_date=None, end_date=None):
+        return self.dfs
+
+    def loadMonths(self, months):
+        return self.dfs
+
+    def refresh(self):
+        return 0
+
+
+class CsvInventory(MemoryInventory):
+    """Inventário lido integralmente de um CSV (local ou remoto).
+
+    O CSV apenas cresce ao final (get_inventory.sh, armobs.collector): a cada
+    ``refresh`` são lidos apenas os bytes escritos após a leitura anterior
+    (requisição com Range para URLs). A origem é considerada inalterada se o
+    tamanho e a data de modificação (ou o ETag) forem os mesmos, e é lida
+    novamente por completo se o conteúdo anterior tiver sido reescrito.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.offset = 0
+        self.signature = None
+        self.digest = None
+        self.columns = None
+        with metrics.stage('inventory.read') as stage:
+            dfs = self._parse(self._read())
+            stage.rows = len(dfs)
+        super().__init__(dfs)
+
+    def _fetch(self, offset):
+        """Bytes da origem a partir de ``offset`` (ou None, se a origem não mudou) e se o conteúdo é completo."""
+        if not isUrl(self.source):
+            with open(self.source, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if signature == self.signature:
+                    return None, False
+                self.signature = signature
+                if stat.st_size < offset:
+                    offset = 0
+                f.seek(offset)
+                return f.read(), offset == 0
+
+        request = urllib.request.Request(self.source)
+        etag, modified = self.signature or (None, None)
+        if etag is not None:
+            request.add_header('If-None-Match', etag)
+        elif modified is not None:
+            request.add_header('If-Modified-Since', modified)
+        if offset > 0:
+            request.add_header('Range', 'bytes={}-'.format(offset))
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                self.signature = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                # Servidores sem suporte a Range retornam o conteúdo completo
+                return response.read(), response.status != 206
+        except urllib.error.HTTPError as err:
+            if err.code == 304:
+                return None, False
+            # 416: o conteúdo é menor do que o já lido (foi reescrito)
+            if err.code == 416 and offset > 0:
+                self.signature = None
+                return self._fetch(0)
+            raise
+
+    def _read(self):
+        """Linhas completas escritas após a leitura anterior (ou None, se não houver)."""
+        # O byte anterior (fim da última linha lida) confirma que o conteúdo apenas cresceu
+        offset = max(self.offset - 1, 0)
+        data, complete = self._fetch(offset)
+        if data is None:
+            return None
+        if not complete and not data.startswith(b'\n'):
+            self.offset, self.signature = 0, None
+            data, complete = self._fetch(0)
+        if not complete:
+            data = data[1:]
+        end = data.rfind(b'\n') + 1
+        if complete:
+            # Conteúdo completo (e.g., servidor sem suporte a Range) idêntico ao já lido
+            digest = hashlib.sha1(data[:end]).digest()
+            if digest == self.digest:
+                return None
+            self.digest = digest
+            self.columns = None
+        self.offset = (0 if complete else self.offset) + end
+        return data[:end]
+
+    def _parse(self, data):
+        if self.columns is None:
+            dfs = readInventoryCsv(io.BytesIO(data))
+            self.columns = list(dfs.columns)
+            return dfs
+        return readInventoryCsv(io.BytesIO(data), header=None, names=self.columns)
+
+    def refresh(self):
+        """Acrescenta as linhas novas da origem; retorna o número de linhas novas."""
+        with metrics.stage('inventory.refresh') as stage:
+            data = self._read()
+            if not data:
+                return 0
+            complete = self.columns is None
+            tail = self._parse(data)
+            stage.rows = len(tail)
+        if complete:
+            self.dfs = tail
+        else:
+            self.dfs = pd.concat([self.dfs, tail], ignore_index=True)
+        self._bounds = None
+        return len(tail)
+
+
+def openInventory(location):
+    """Abre o inventário a partir de um diretório de partições, de um CSV local ou de uma URL."""
+    if os.path.isdir(location):
+        return InventoryStore(location)
+    return CsvInventory(location)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Acrescenta os novos ciclos do inventário ao armazenamento em partições mensais.')
+    parser.add_argument('source', help='CSV do inventário (caminho local ou URL), e.g., mon_rec_obs_final.csv')
+    parser.add_argument('store', help='diretório das partições mensais (Parquet)')
+    args = parser.parse_args(argv)
+
+    store = InventoryStore(args.store)
+    appended = ingestCsv(args.source, store)
+    first, last = store.bounds()
+    print('{} linhas acrescentadas; armazenamento entre {} e {}'.format(appended, first, last))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Latência da disponibilidade dos arquivos de observação
+#
+# Calcula, de forma vetorizada (sobre as colunas do inventário, sem percorrer
+# as linhas), a diferença entre a data do download e a data da observação
+# ('Diferença de Tempo', descontado o fuso horário) e a margem entre o download
+# e o início do ciclo de assimilação registrado no log do GSI ('Início do Ciclo
+# AD'). Ambas as datas do cálculo da margem são registradas no relógio da
+# máquina, de modo que o fuso horário não é descontado; uma margem negativa
+# indica que o arquivo chegou depois do início do ciclo (arquivo atrasado).
+
+import numpy as np
+import pandas as pd
+
+# Diferença entre o fuso horário das datas do download e o GMT (veja as notas do dashboard)
+TIMEZONE_OFFSET = pd.Timedelta(hours=3)
+
+LATENCY_COLUMNS = ['Data do Download', 'Data da Observação']
+
+MARGIN_COLUMNS = ['Data do Download', 'Início do Ciclo AD']
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def hasLatency(dfs):
+    """Verifica se o inventário possui as colunas utilizadas no cálculo da latência."""
+    return all(column in dfs.columns for column in LATENCY_COLUMNS)
+
+
+def _hours(delta):
+    # timedelta64[ns] -> horas (NaT -> NaN)
+    values = np.asarray(delta, dtype='timedelta64[ns]')
+    hours = values.astype(np.int64) / 3.6e12
+    hours[np.isnat(values)] = np.nan
+    return hours
+
+
+def timeDifference(dfs):
+    """Diferença entre a data do download e a data da observação ('Diferença de Tempo')."""
+    delta = (dfs['Data do Download'] - dfs['Data da Observação']) - TIMEZONE_OFFSET
+    return delta.rename('Diferença de Tempo')
+
+
+def gsiMargin(dfs):
+    """Tempo entre o download e o início do ciclo AD (negativo para os arquivos atrasados; NaT sem o log do GSI)."""
+    if 'Início do Ciclo AD' not in dfs.columns:
+        return pd.Series(pd.NaT, index=dfs.index, dtype='timedelta64[ns]', name='Margem para o Ciclo AD')
+    start = pd.to_datetime(dfs['Início do Ciclo AD'], errors='coerce')
+    return (start - dfs['Data do Download']).rename('Margem para o Ciclo AD')
+
+
+def latencyByOtype(dfs, quantiles=QUANTILES):
+    """Quantis da latência (em horas) e número de arquivos atrasados de cada tipo de observação."""
+    otypes = dfs['Tipo de Observação']
+    latency = pd.Series(_hours(timeDifference(dfs)), index=dfs.index)
+    margin = _hours(gsiMargin(dfs))
+
+    grouped = latency.groupby(otypes, observed=True, sort=True)
+    stats = grouped.quantile(list(quantiles)).unstack()
+    stats.columns = ['q{:02.0f}'.format(q * 100) for q in stats.columns]
+    stats['Arquivos'] = grouped.size()
+    stats['Atrasados'] = pd.Series(margin < 0, index=dfs.index).groupby(otypes, observed=True, sort=True).sum()
+    stats['Sem Log do GSI'] = pd.Series(np.isnan(margin), index=dfs.index).groupby(otypes, observed=True, sort=True).sum()
+    stats.index.name = 'Tipo de Observação'
+    return stats
+
+
+def lateFiles(dfs, limit=None):
+    """Arquivos que chegaram depois do início do ciclo AD, dos mais atrasados para os menos atrasados."""
+    margin = gsiMargin(dfs)
+    late = (margin < pd.Timedelta(0)).to_numpy()
+    dfl = dfs[late].assign(**{'Diferença de Tempo': timeDifference(dfs)[late], margin.name: margin[late]})
+    dfl = dfl.sort_values(margin.name, kind='stable')
+    return dfl if limit is None else dfl.head(limit)
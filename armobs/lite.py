@@ -0,0 +1,74 @@
+# Resumo binário do inventário para a versão do dashboard executada no navegador
+#
+# Na versão convertida com o panel convert (pyodide), o download e a leitura do
+# CSV completo atrasam a primeira exibição do dashboard. O resumo contém
+# apenas o tamanho total de cada (dia, tipo de observação, tipo de arquivo),
+# somado sobre os horários sinóticos (um quarto das linhas do inventário),
+# com os dias em datetime64 e os tipos como códigos inteiros, em um arquivo
+# .npz compactado (lido apenas com o numpy). Com ele são exibidos o total
+# armazenado e os gráficos de todos os horários; o inventário completo (as
+# demais colunas da tabela e a escolha dos horários) é carregado depois, em
+# segundo plano.
+#
+# Uso:
+#
+#   python -m armobs.lite mon_rec_obs_final.csv mon_rec_obs_resumo.npz
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_FILE = 'mon_rec_obs_resumo.npz'
+
+
+def summarize(dfs):
+    """Tamanho total por (dia, tipo de observação, tipo de arquivo), somado sobre os horários sinóticos."""
+    dfs = dfs.assign(**{'Data da Observação': dfs['Data da Observação'].dt.normalize()})
+    keys = ['Data da Observação', 'Tipo de Observação', 'Tipo de Arquivo']
+    return dfs.groupby(keys, observed=True, sort=True)['Tamanho do Download (KB)'].sum().reset_index()
+
+
+def writeSummary(dfs, path=SUMMARY_FILE):
+    agg = summarize(dfs)
+    otypes = agg['Tipo de Observação'].astype('category')
+    ftypes = agg['Tipo de Arquivo'].astype('category')
+    np.savez_compressed(
+        path,
+        date=agg['Data da Observação'].to_numpy().astype('datetime64[D]'),
+        otype=otypes.cat.codes.to_numpy().astype(np.uint8),
+        ftype=ftypes.cat.codes.to_numpy().astype(np.uint8),
+        size=agg['Tamanho do Download (KB)'].to_numpy().astype(np.int64),
+        otypes=np.array(otypes.cat.categories, dtype=str),
+        ftypes=np.array(ftypes.cat.categories, dtype=str),
+    )
+    return len(agg)
+
+
+def readSummary(path=SUMMARY_FILE):
+    """Inventário (apenas as colunas do resumo, com os totais diários às 00Z) lido do arquivo .npz."""
+    with np.load(path) as data:
+        dates = pd.DatetimeIndex(data['date'].astype('datetime64[ns]'))
+        return pd.DataFrame({
+            'Tamanho do Download (KB)': data['size'],
+            'Tipo de Arquivo': pd.Categorical.from_codes(data['ftype'], categories=list(data['ftypes'])),
+            'Horário Sinótico': dates.hour,
+            'Tipo de Observação': pd.Categorical.from_codes(data['otype'], categories=list(data['otypes'])),
+            'Data da Observação': dates,
+        })
+
+
+def main(argv=None):
+    from armobs.ingest import openInventory
+
+    parser = argparse.ArgumentParser(description='Escreve o resumo binário do inventário utilizado pela versão do dashboard executada no navegador.')
+    parser.add_argument('source', help='inventário (CSV local, URL ou diretório das partições mensais)')
+    parser.add_argument('output', nargs='?', default=SUMMARY_FILE, help='arquivo .npz de saída')
+    args = parser.parse_args(argv)
+
+    nrows = writeSummary(openInventory(args.source).load(), args.output)
+    print('{} linhas escritas em {}'.format(nrows, args.output))
+
+
+if __name__ == '__main__':
+    main()
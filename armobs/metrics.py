@@ -0,0 +1,173 @@
+# Instrumentação opcional das etapas do dashboard
+#
+# Ativada com a variável de ambiente ARMOBS_METRICS=1. As etapas (leitura do
+# inventário, indexação, seleção, paginação, cálculos e construção das
+# visualizações) registram o tempo de execução e o número de linhas
+# processadas; os caches registram os acertos e as falhas. Os valores
+# acumulados são exibidos na aba de diagnóstico do dashboard, no formato de
+# texto do Prometheus (armobs.server, panel serve --plugins armobs.server) e,
+# para cada execução de uma etapa, como uma linha JSON no log (logger
+# armobs.metrics).
+#
+# Desativada, a instrumentação não tem custo: ``timed`` retorna a própria
+# função decorada e ``stage`` retorna um objeto sem efeito.
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('ARMOBS_METRICS', '0') not in ('', '0')
+
+logger = logging.getLogger(__name__)
+if ENABLED:
+    logger.setLevel(logging.INFO)
+    if not logger.hasHandlers():
+        logger.addHandler(logging.StreamHandler())
+
+
+class Metrics:
+    """Tempos e linhas acumulados por etapa, contadores e caches monitorados."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, rows=None):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0}
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            if rows is not None:
+                entry['rows'] += int(rows)
+        logger.info(json.dumps({'stage': stage, 'seconds': round(seconds, 6), 'rows': rows}))
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def registerCache(self, name, cache):
+        """Monitora os acertos e as falhas de um armobs.cache.LRUCache."""
+        self.caches[name] = cache
+
+    def snapshot(self):
+        with self._lock:
+            stages = {stage: dict(entry) for stage, entry in self.stages.items()}
+            counters = dict(self.counters)
+        caches = {name: {'hits': cache.hits, 'misses': cache.misses, 'items': len(cache), 'bytes': cache.nbytes}
+                  for name, cache in self.caches.items()}
+        return {'stages': stages, 'counters': counters, 'caches': caches}
+
+    def prometheus(self):
+        """Valores acumulados no formato de texto do Prometheus."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append('# HELP {} {}'.format(name, help))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for labels, value in samples:
+                labels = ','.join('{}="{}"'.format(key, val) for key, val in labels.items())
+                lines.append('{}{{{}}} {}'.format(name, labels, value) if labels else '{} {}'.format(name, value))
+
+        stages = sorted(snapshot['stages'].items())
+        metric('armobs_stage_seconds_total', 'counter', 'Tempo total de execução de cada etapa.',
+               [({'stage': stage}, entry['seconds']) for stage, entry in stages])
+        metric('armobs_stage_calls_total', 'counter', 'Número de execuções de cada etapa.',
+               [({'stage': stage}, entry['count']) for stage, entry in stages])
+        metric('armobs_stage_seconds_max', 'gauge', 'Maior tempo de execução de cada etapa.',
+               [({'stage': stage}, entry['max_seconds']) for stage, entry in stages])
+        metric('armobs_stage_rows_total', 'counter', 'Número de linhas processadas em cada etapa.',
+               [({'stage': stage}, entry['rows']) for stage, entry in stages])
+
+        caches = sorted(snapshot['caches'].items())
+        metric('armobs_cache_hits_total', 'counter', 'Acertos de cada cache.',
+               [({'cache': name}, cache['hits']) for name, cache in caches])
+        metric('armobs_cache_misses_total', 'counter', 'Falhas de cada cache.',
+               [({'cache': name}, cache['misses']) for name, cache in caches])
+        metric('armobs_cache_items', 'gauge', 'Número de itens de cada cache.',
+               [({'cache': name}, cache['items']) for name, cache in caches])
+        metric('armobs_cache_bytes', 'gauge', 'Memória ocupada pelos itens de cada cache.',
+               [({'cache': name}, cache['bytes']) for name, cache in caches])
+
+        metric('armobs_events_total', 'counter', 'Número de ocorrências de cada evento.',
+               [({'event': name}, value) for name, value in sorted(snapshot['counters'].items())])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Metrics()
+
+
+class _Stage:
+    __slots__ = ('name', 'rows', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, time.perf_counter() - self.start, self.rows)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Contexto que registra o tempo da etapa ``name`` (o número de linhas pode ser atribuído a ``rows``)."""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+
+def timed(name):
+    """Decorador que registra o tempo de execução de cada chamada da função (ou corrotina)."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with _Stage(name):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Stage(name):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe(stage, seconds, rows=None):
+    if ENABLED:
+        registry.observe(stage, seconds, rows)
+
+
+def increment(name, value=1):
+    if ENABLED:
+        registry.increment(name, value)
@@ -0,0 +1,301 @@
+# Relatório mensal (estático) do armazenamento das observações
+#
+# Gera, sem navegador (e.g., em um cron), os resumos exibidos no dashboard para
+# cada mês do inventário: o total armazenado e o número de arquivos de cada
+# tipo de observação, para cada tipo de arquivo e horário sinótico (calculados
+# com o mesmo cubo de agregação do total armazenado e do gráfico de setores do
+# dashboard), e o total diário de cada tipo de observação (gráfico de linhas).
+# Os resumos são gravados em Parquet (resumo_AAAA-MM.parquet e
+# diario_AAAA-MM.parquet) e em uma página HTML estática por mês (AAAA-MM.html,
+# com os gráficos do Bokeh), além de um índice (index.html).
+#
+# Os meses são processados em paralelo, em processos separados. Os meses cuja
+# entrada não mudou desde a execução anterior (assinaturas registradas em
+# manifest.json, no diretório do relatório) não são processados novamente.
+#
+# Uso:
+#
+#   python -m armobs.report mon_rec_obs_final.csv relatorio/
+#   python -m armobs.report inventario/ relatorio/ --months 2023-09 2023-10 --workers 4
+
+import argparse
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from armobs.dataset import Dataset
+from armobs.ingest import InventoryStore, openInventory, writeAtomic
+from armobs.synoptic import SYNOPTIC_TIMES, hourMask
+
+# Incrementada quando o conteúdo do relatório muda (todos os meses são gerados novamente)
+REPORT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+
+# Rótulo das linhas que agregam todos os tipos de arquivo ou todos os horários
+ALL = 'Todos'
+
+PAGE = """<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{resources}
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #ccc; padding: 0.25em 0.75em; text-align: right; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+def monthRange(month):
+    """Primeiro e último instantes do mês ('AAAA-MM')."""
+    start = pd.Timestamp(month + '-01')
+    return start, start + pd.offsets.MonthBegin(1) - pd.Timedelta(seconds=1)
+
+
+def monthSummary(dataset, month):
+    """Tamanho total (KB) e número de arquivos de cada tipo de observação, por tipo de arquivo e horário."""
+    start, end = monthRange(month)
+    otypes = dataset.index.otypes
+    ftype_sets = [(ftype, [ftype]) for ftype in dataset.index.ftypes] + [(ALL, dataset.index.ftypes)]
+    hour_sets = [(hour, [hour]) for hour in SYNOPTIC_TIMES] + [(ALL, SYNOPTIC_TIMES)]
+
+    frames = []
+    for ftype_label, ftypes in ftype_sets:
+        for hour_label, hours in hour_sets:
+            mask = hourMask(hours)
+            frames.append(pd.DataFrame({
+                'Mês': month,
+                'Tipo de Arquivo': ftype_label,
+                'Horário Sinótico': hour_label,
+                'Tipo de Observação': otypes,
+                'Tamanho do Download (KB)': dataset.rollup.sizeByOtype(otypes, ftypes, mask, start, end).to_numpy(),
+                'Arquivos': dataset.rollup.countByOtype(otypes, ftypes, mask, start, end).to_numpy(),
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def dailySeries(dataset):
+    """Tamanho total (KB) e número de arquivos de cada dia, tipo de observação e tipo de arquivo."""
+    frame = dataset.frame
+    day = frame['Data da Observação'].dt.floor('D')
+    daily = frame.groupby([day, 'Tipo de Observação', 'Tipo de Arquivo'], observed=True, sort=True)
+    daily = daily['Tamanho do Download (KB)'].agg(['sum', 'size'])
+    return daily.rename(columns={'sum': 'Tamanho do Download (KB)', 'size': 'Arquivos'}).reset_index()
+
+
+def overall(summary):
+    """Linhas do resumo com todos os tipos de arquivo e horários, indexadas pelo tipo de observação."""
+    rows = summary[(summary['Tipo de Arquivo'] == ALL) & (summary['Horário Sinótico'] == ALL)]
+    return rows.set_index('Tipo de Observação')
+
+
+def _table(dfs, float_format='{:,.2f}'.format):
+    return dfs.to_html(float_format=float_format, border=0)
+
+
+def monthPage(month, summary, daily):
+    """Página HTML estática do mês (tabelas e gráficos do Bokeh, carregado de um CDN)."""
+    from bokeh.embed import components
+    from bokeh.layouts import column
+    from bokeh.palettes import Category20
+    from bokeh.plotting import figure
+    from bokeh.resources import CDN
+
+    gb = 1 / (1024 ** 3)
+    totals = overall(summary)
+    total = totals['Tamanho do Download (KB)'].sum()
+
+    by_otype = pd.DataFrame({
+        'Tamanho (GB)': totals['Tamanho do Download (KB)'] * gb,
+        'Tamanho Relativo (%)': totals['Tamanho do Download (KB)'] / total * 100 if total else 0.0,
+        'Arquivos': totals['Arquivos'],
+    })
+    all_ftypes = summary[summary['Tipo de Arquivo'] == ALL]
+    by_hour = all_ftypes.pivot(index='Tipo de Observação', columns='Horário Sinótico',
+                               values='Tamanho do Download (KB)') * gb
+    all_hours = summary[summary['Horário Sinótico'] == ALL]
+    by_ftype = all_hours.pivot(index='Tipo de Observação', columns='Tipo de Arquivo',
+                               values='Tamanho do Download (KB)') * gb
+
+    # Total diário de cada tipo de observação (todos os tipos de arquivo), em MB
+    lines = daily.groupby(['Data da Observação', 'Tipo de Observação'], observed=True)['Tamanho do Download (KB)'].sum()
+    p_line = figure(x_axis_type='datetime', width=1000, height=450, title='Tamanho diário (MB)')
+    for count, (otype, series) in enumerate(lines.groupby(level='Tipo de Observação', observed=True)):
+        dates = series.index.get_level_values('Data da Observação')
+        p_line.line(dates, series.to_numpy() / (1024 ** 2), legend_label=str(otype), line_width=2,
+                    color=Category20[20][count % 20])
+    p_line.legend.location = 'top_left'
+    p_line.legend.click_policy = 'hide'
+
+    otypes = [str(otype) for otype in by_otype.index]
+    p_bar = figure(y_range=otypes[::-1], width=1000, height=30 * len(otypes) + 80, title='Tamanho Relativo (%)')
+    p_bar.hbar(y=otypes, right=by_otype['Tamanho Relativo (%)'].to_numpy(), height=0.8,
+               color=[Category20[20][count % 20] for count in range(len(otypes))])
+
+    script, div = components(column(p_line, p_bar))
+    body = '\n'.join([
+        '<p><b>Total armazenado:</b> {:,.2f} GB em {:,} arquivos</p>'.format(total * gb, int(totals['Arquivos'].sum())),
+        div,
+        '<h2>Tipos de observação</h2>', _table(by_otype),
+        '<h2>Tamanho por horário sinótico (GB)</h2>', _table(by_hour),
+        '<h2>Tamanho por tipo de arquivo (GB)</h2>', _table(by_ftype),
+        script,
+    ])
+    title = 'Armazenamento das observações do SMNA: {}'.format(month)
+    return PAGE.format(title=html.escape(title), resources=CDN.render(), body=body)
+
+
+def indexPage(months):
+    """Índice do relatório: total armazenado e número de arquivos de cada mês ({mês: (total em KB, arquivos)})."""
+    rows = ['<tr><td><a href="{0}.html">{0}</a></td><td>{1:,.2f}</td><td>{2:,}</td></tr>'.format(
+        month, total / (1024 ** 3), files) for month, (total, files) in sorted(months.items())]
+    body = ('<table><tr><th>Mês</th><th>Total armazenado (GB)</th><th>Arquivos</th></tr>\n' +
+            '\n'.join(rows) + '\n</table>')
+    return PAGE.format(title='Armazenamento das observações do SMNA', resources='', body=body)
+
+
+def renderMonth(month, dfs, output):
+    """Gera os resumos e a página do mês; ``dfs`` é o inventário do mês ou o caminho da sua partição.
+
+    Executada em um processo separado; retorna o total armazenado (KB) e o número de arquivos.
+    """
+    if isinstance(dfs, str):
+        dfs = pd.read_parquet(dfs)
+    dataset = Dataset(dfs.drop(columns=['Nome do Arquivo'], errors='ignore'))
+    summary = monthSummary(dataset, month)
+    daily = dailySeries(dataset)
+
+    writeAtomic(os.path.join(output, 'resumo_{}.parquet'.format(month)),
+                lambda tmp: summary.to_parquet(tmp, index=False))
+    writeAtomic(os.path.join(output, 'diario_{}.parquet'.format(month)),
+                lambda tmp: daily.to_parquet(tmp, index=False))
+    page = monthPage(month, summary, daily)
+
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(page)
+    writeAtomic(os.path.join(output, '{}.html'.format(month)), write)
+
+    totals = overall(summary)
+    return float(totals['Tamanho do Download (KB)'].sum()), int(totals['Arquivos'].sum())
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def monthInputs(inventory):
+    """Entrada de cada mês do inventário: {mês: (assinatura, inventário do mês ou caminho da partição)}.
+
+    As partições mensais (armobs.ingest) são identificadas pelo registro do
+    manifesto e pelo tamanho e data de modificação do arquivo, sem serem lidas.
+    Um CSV é lido uma única vez e cada mês é identificado pelo hash das suas linhas.
+    """
+    inputs = {}
+    if isinstance(inventory, InventoryStore):
+        for month in inventory.months():
+            path = inventory.partitionPath(month)
+            stat = os.stat(path)
+            signature = json.dumps([inventory.manifest['partitions'][month], stat.st_size, stat.st_mtime_ns],
+                                   sort_keys=True, default=str)
+            inputs[month] = (_digest(signature.encode()), path)
+        return inputs
+
+    dfs = inventory.load()
+    months = dfs['Data da Observação'].dt.to_period('M')
+    for month, part in dfs.groupby(months, sort=True):
+        hashes = pd.util.hash_pandas_object(part, index=False).to_numpy()
+        inputs[str(month)] = (_digest(hashes.tobytes()), part)
+    return inputs
+
+
+def loadManifest(output):
+    path = os.path.join(output, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'version': REPORT_VERSION, 'months': {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != REPORT_VERSION:
+        manifest = {'version': REPORT_VERSION, 'months': {}}
+    return manifest
+
+
+def saveManifest(output, manifest):
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    writeAtomic(os.path.join(output, MANIFEST_FILE), write)
+
+
+def isCurrent(output, month, entry, signature):
+    """Verifica se os artefatos do mês foram gerados a partir da mesma entrada."""
+    return (entry is not None and entry['signature'] == signature and
+            os.path.exists(os.path.join(output, '{}.html'.format(month))))
+
+
+def buildReport(location, output, months=None, workers=None, force=False):
+    """Gera o relatório dos meses do inventário em ``location``; retorna os meses gerados e os inalterados."""
+    os.makedirs(output, exist_ok=True)
+    manifest = loadManifest(output)
+    inputs = monthInputs(openInventory(location))
+    if months:
+        inputs = {month: value for month, value in inputs.items() if month in months}
+
+    pending = {month: value for month, value in inputs.items()
+               if force or not isCurrent(output, month, manifest['months'].get(month), value[0])}
+    skipped = sorted(set(inputs) - set(pending))
+
+    def done(month, result):
+        total, files = result
+        manifest['months'][month] = {'signature': pending[month][0], 'total': total, 'files': files}
+        # O manifesto é gravado a cada mês, de modo que uma execução interrompida é retomada
+        saveManifest(output, manifest)
+
+    if workers == 1 or len(pending) <= 1:
+        for month, (signature, dfs) in pending.items():
+            done(month, renderMonth(month, dfs, output))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {pool.submit(renderMonth, month, dfs, output): month for month, (signature, dfs) in pending.items()}
+            for future in as_completed(futures):
+                done(futures[future], future.result())
+
+    page = indexPage({month: (entry['total'], entry['files']) for month, entry in manifest['months'].items()
+                      if os.path.exists(os.path.join(output, '{}.html'.format(month)))})
+
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(page)
+    writeAtomic(os.path.join(output, 'index.html'), write)
+    return sorted(pending), skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera o relatório mensal (estático) do armazenamento das observações.')
+    parser.add_argument('source', help='inventário: CSV (caminho local ou URL) ou diretório das partições mensais')
+    parser.add_argument('output', help='diretório do relatório')
+    parser.add_argument('--months', nargs='+', default=None, help='meses (AAAA-MM) a gerar (padrão: todos)')
+    parser.add_argument('--workers', type=int, default=None, help='número de processos (padrão: número de CPUs)')
+    parser.add_argument('--force', action='store_true', help='gera novamente os meses inalterados')
+    args = parser.parse_args(argv)
+
+    built, skipped = buildReport(args.source, args.output, args.months, args.workers, args.force)
+    print('{} meses gerados, {} inalterados; índice em {}'.format(
+        len(built), len(skipped), os.path.join(args.output, 'index.html')))
+
+
+if __name__ == '__main__':
+    main()
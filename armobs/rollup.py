@@ -0,0 +1,50 @@
+# Cubo de agregação (rollup) do tamanho dos arquivos de observação
+#
+# Para cada combinação (tipo de observação, tipo de arquivo, horário sinótico)
+# do índice do inventário é guardada a soma acumulada de
+# 'Tamanho do Download (KB)' ao longo das datas. O total de qualquer período
+# é obtido com duas consultas e uma subtração, independentemente do tamanho
+# do período.
+
+import numpy as np
+import pandas as pd
+
+
+class RollupCube:
+    """Somas acumuladas do tamanho dos arquivos por (otype, ftype, hora)."""
+
+    def __init__(self, index, column='Tamanho do Download (KB)'):
+        self.index = index
+        self.column = column
+
+        sizes = index.frame[column].to_numpy()
+        # Tamanhos inteiros são acumulados em int64 (soma exata)
+        dtype = np.int64 if np.issubdtype(sizes.dtype, np.integer) else np.float64
+        self.cumsums = {}
+        for key, offsets in index.groups.items():
+            cumsum = np.zeros(len(offsets) + 1, dtype=dtype)
+            np.cumsum(sizes[offsets], dtype=dtype, out=cumsum[1:])
+            self.cumsums[key] = cumsum
+
+    def sizeByOtype(self, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Tamanho total (na unidade da coluna) de cada tipo de observação escolhido no período.
+
+        Retorna uma nova série a cada chamada (indexada na ordem de ``otype_w``),
+        de forma que cada sessão do dashboard tenha o seu próprio resultado.
+        """
+        totals = dict.fromkeys(otype_w, 0.0)
+        for key, lo, hi in self.index.groupSlices(otype_w, ftype_w, hour_mask, start_date, end_date):
+            cumsum = self.cumsums[key]
+            totals[key[0]] += cumsum[hi] - cumsum[lo]
+        return pd.Series(totals, index=list(totals), dtype=np.float64, name=self.column)
+
+    def countByOtype(self, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Número de arquivos de cada tipo de observação escolhido no período."""
+        counts = dict.fromkeys(otype_w, 0)
+        for key, lo, hi in self.index.groupSlices(otype_w, ftype_w, hour_mask, start_date, end_date):
+            counts[key[0]] += hi - lo
+        return pd.Series(counts, index=list(counts), dtype=np.int64, name='Arquivos')
+
+    def total(self, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Tamanho total (na unidade da coluna) da seleção no período."""
+        return float(self.sizeByOtype(otype_w, ftype_w, hour_mask, start_date, end_date).sum())
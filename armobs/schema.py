@@ -0,0 +1,39 @@
+# Layout compacto do inventário em memória
+#
+# Aplicado uma única vez, na carga dos dados: as colunas de texto repetido
+# passam a ser categóricas, o início do ciclo AD passa a ser uma data e os
+# inteiros são reduzidos ao menor tipo que comporta os seus valores. As
+# conversões de unidade não são armazenadas no dataframe; elas são aplicadas
+# apenas aos totais e às linhas exibidas (página da tabela, pontos do gráfico).
+
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['Tipo de Observação', 'Tipo de Arquivo', 'Horário Sinótico', 'Fuso Horário']
+
+INTEGER_COLUMNS = ['Tamanho do Download (KB)']
+
+
+def compactInventory(dfs):
+    """Inventário com o layout compacto (o dataframe original não é modificado)."""
+    dfs = dfs.copy(deep=False)
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in dfs.columns and not isinstance(dfs[col].dtype, pd.CategoricalDtype):
+            dfs[col] = dfs[col].astype('category')
+
+    col = 'Início do Ciclo AD'
+    if col in dfs.columns and not pd.api.types.is_datetime64_any_dtype(dfs[col]):
+        # Ciclos sem log do GSI são registrados como 'AAAA-MM-DD NaT'
+        dfs[col] = pd.to_datetime(dfs[col], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+
+    for col in INTEGER_COLUMNS:
+        if col in dfs.columns and pd.api.types.is_integer_dtype(dfs[col]):
+            downcast = 'unsigned' if len(dfs) == 0 or dfs[col].min() >= 0 else 'integer'
+            dfs[col] = pd.to_numeric(dfs[col], downcast=downcast)
+
+    return dfs
+
+
+def memoryUsage(dfs):
+    """Memória (em bytes) utilizada pelo dataframe, incluindo o conteúdo das colunas de texto."""
+    return int(dfs.memory_usage(deep=True).sum())
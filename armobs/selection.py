@@ -0,0 +1,56 @@
+# Estágio de seleção do inventário compartilhado pelas visualizações do dashboard
+#
+# Os widgets (tipo de observação, tipo de arquivo, horário sinótico e período)
+# definem uma única seleção do inventário. Ela é calculada uma vez para cada
+# combinação de parâmetros e reutilizada por todas as visualizações.
+
+import itertools
+
+import pandas as pd
+
+from armobs import metrics
+from armobs.cache import LRUCache
+from armobs.synoptic import hourMask
+
+# Identifica as seleções de cada inventário nos caches compartilhados
+_versions = itertools.count(1)
+
+
+def filterInventory(index, otype_w, ftype_w, synoptic_time, date_range):
+    """Aplica os filtros dos widgets ao inventário indexado (armobs.index.InventoryIndex).
+
+    ``synoptic_time`` é a lista de horários escolhidos (e.g., ['00Z', '18Z']).
+    """
+    start_date, end_date = date_range
+    return index.select(otype_w, ftype_w, hourMask(synoptic_time), start_date, end_date)
+
+
+def selectionKey(otype_w, ftype_w, synoptic_time, date_range):
+    """Chave (hashable) que identifica uma seleção; a ordem dos itens escolhidos não importa."""
+    start_date, end_date = date_range
+    return (tuple(sorted(otype_w)), tuple(sorted(ftype_w)), hourMask(synoptic_time),
+            pd.Timestamp(start_date), pd.Timestamp(end_date))
+
+
+class Selection:
+    """Seleção do inventário memoizada pelos parâmetros dos widgets.
+
+    O resultado é compartilhado entre as visualizações (e, com um ``cache``
+    compartilhado, entre as sessões) e não deve ser modificado por elas
+    (utilize ``assign`` para acrescentar colunas).
+    """
+
+    def __init__(self, index, maxsize=32, cache=None):
+        self.index = index
+        self.version = next(_versions)
+        self.cache = LRUCache(maxsize) if cache is None else cache
+
+    def __call__(self, otype_w, ftype_w, synoptic_time, date_range):
+        key = (self.version,) + selectionKey(otype_w, ftype_w, synoptic_time, date_range)
+        dfsp = self.cache.get(key)
+        if dfsp is None:
+            with metrics.stage('selection') as stage:
+                dfsp = filterInventory(self.index, otype_w, ftype_w, synoptic_time, date_range)
+                stage.rows = len(dfsp)
+            self.cache[key] = dfsp
+        return dfsp
@@ -0,0 +1,190 @@
+# Rotas adicionais do servidor do dashboard
+#
+# Carregadas com a opção --plugins do panel serve (Panel 1.5.5 ou superior; o
+# módulo precisa estar no caminho de importação, e.g., executando o comando a
+# partir da raiz do repositório):
+#
+#   ARMOBS_METRICS=1 panel serve SMNA-Dashboard-ArmObs.py --plugins armobs.server
+#
+# * /metrics: valores acumulados da instrumentação (armobs.metrics) no formato
+#   de texto do Prometheus.
+# * /export: linhas da seleção como um arquivo (CSV, por padrão, Parquet ou
+#   Arrow), enviado em blocos à medida que é escrito (armobs.export).
+# * /query: linhas da seleção ou agregações (agg=rows, otype, day, missing ou
+#   outliers), no formato Arrow (por padrão), Parquet ou CSV.
+#
+# As duas últimas rotas recebem os mesmos parâmetros dos widgets do dashboard,
+# repetidos ou separados por vírgulas (e.g.,
+# /query?otype=atms,gpsro&ftype=gdas&hour=00Z&hour=12Z&start=2023-03-01&end=2023-05-02&agg=otype);
+# sem um parâmetro, são considerados todos os valores (e todo o período); um
+# parâmetro vazio (e.g., otype=) não escolhe nenhum valor, como um widget vazio. Os
+# inventários são os mesmos das sessões do dashboard (variáveis de ambiente
+# ARMOBS_SOURCES e ARMOBS_DATA), lidos uma única vez pelo processo. Em caso
+# de erro, a mensagem é enviada no corpo da resposta (a linha de status do
+# HTTP contém apenas a frase padrão, em ASCII).
+
+import os
+import threading
+
+import pandas as pd
+from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
+from tornado.web import HTTPError, RequestHandler
+
+from armobs import metrics
+from armobs.export import FORMATS, exportName, writeChunks
+from armobs.ingest import INVENTORY_URL
+from armobs.session import executor
+from armobs.sources import openSources, parseSources
+from armobs.synoptic import SYNOPTIC_TIMES, hourMask
+
+AGGREGATES = ['rows', 'otype', 'day', 'missing', 'outliers']
+
+_registry = None
+_lock = threading.Lock()
+
+
+def sharedRegistry():
+    """Registro dos inventários do dashboard (as mesmas origens e o mesmo Dataset das sessões)."""
+    global _registry
+    with _lock:
+        if _registry is None:
+            sources = parseSources(os.environ.get('ARMOBS_SOURCES'),
+                                   default=os.environ.get('ARMOBS_DATA', INVENTORY_URL))
+            _registry = openSources(sources, drop=['Nome do Arquivo'],
+                                    refresh=int(os.environ.get('ARMOBS_REFRESH', 300)))
+    return _registry
+
+
+class QueryError(HTTPError):
+    """Parâmetro inválido (ou inventário vazio): ``message`` é enviada no corpo da resposta."""
+
+    def __init__(self, status_code, message):
+        super().__init__(status_code, '%s', message)
+        self.message = message
+
+
+class MetricsHandler(RequestHandler):
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(metrics.registry.prometheus())
+
+
+class QueryHandler(RequestHandler):
+    """Seleção (ou agregação) do inventário definida pelos parâmetros da URL."""
+
+    default_format = 'arrow'
+    aggregates = AGGREGATES
+    attachment = False
+
+    def write_error(self, status_code, **kwargs):
+        error = kwargs.get('exc_info', (None, None))[1]
+        if not isinstance(error, QueryError):
+            return super().write_error(status_code, **kwargs)
+        self.set_header('Content-Type', 'text/plain; charset=utf-8')
+        self.finish(error.message + '\n')
+
+    def values(self, name, default=None):
+        """Valores do parâmetro ``name`` (``default``, se o parâmetro não estiver na URL)."""
+        arguments = self.get_arguments(name)
+        if not arguments:
+            return default
+        return [value.strip() for argument in arguments for value in argument.split(',') if value.strip()]
+
+    def timestamp(self, name, default):
+        value = self.get_argument(name, None)
+        if not value:
+            return default
+        try:
+            return pd.Timestamp(value)
+        except ValueError:
+            raise QueryError(400, 'Data inválida: {}={}'.format(name, value))
+
+    def parameters(self, registry):
+        """Origens, tipos de observação e de arquivo, horários e período escolhidos."""
+        names = self.values('source', registry.names)
+        unknown = [name for name in names if name not in registry.datasets]
+        if unknown:
+            raise QueryError(400, 'Origem desconhecida: {}'.format(', '.join(unknown)))
+
+        first_date, last_date = registry.bounds(names)
+        start_date, end_date = self.timestamp('start', first_date), self.timestamp('end', last_date)
+        if start_date is None or end_date is None:
+            raise QueryError(404, 'Inventário vazio')
+
+        otypes, ftypes = self.values('otype'), self.values('ftype')
+        if otypes is None or ftypes is None:
+            datasets = registry.cover(names, start_date, end_date).values()
+            if otypes is None:
+                otypes = sorted({otype for dataset in datasets for otype in dataset.index.otypes})
+            if ftypes is None:
+                ftypes = sorted({ftype for dataset in datasets for ftype in dataset.index.ftypes})
+
+        hours = self.values('hour', SYNOPTIC_TIMES)
+        try:
+            hours = ['{:02d}Z'.format(int(hour.upper().rstrip('Z'))) for hour in hours]
+        except ValueError:
+            raise QueryError(400, 'Horário inválido: {}'.format(', '.join(hours)))
+        return names, otypes, ftypes, hours, (start_date, end_date)
+
+    def chunks(self, registry, agg, names, otypes, ftypes, hours, date_range):
+        """Blocos do resultado (calculados apenas quando solicitados, no executor)."""
+        start_date, end_date = date_range
+        hour_mask = hourMask(hours)
+        if agg == 'rows':
+            yield from registry.chunks(names, otypes, ftypes, hours, date_range)
+        elif agg == 'otype':
+            result = registry.sizeByOtype(names, otypes, ftypes, hour_mask, start_date, end_date)
+            yield result.rename_axis('Tipo de Observação').reset_index(name='Tamanho do Download (KB)')
+        elif agg == 'day':
+            result = registry.dailyTotals(names, otypes, ftypes, hour_mask, start_date, end_date)
+            yield result.rename_axis('Data da Observação').reset_index()
+        else:
+            yield getattr(registry, agg)(names, otypes, ftypes, hour_mask, start_date, end_date)
+
+    async def get(self):
+        fmt = self.get_argument('format', self.default_format)
+        if fmt not in FORMATS:
+            raise QueryError(400, 'Formato desconhecido: {}'.format(fmt))
+        agg = self.get_argument('agg', 'rows')
+        if agg not in self.aggregates:
+            raise QueryError(400, 'Agregação desconhecida: {}'.format(agg))
+
+        loop = IOLoop.current()
+        # A leitura do inventário (na primeira requisição), os cálculos e a conversão de cada bloco são feitos no executor
+        registry = await loop.run_in_executor(executor, sharedRegistry)
+        names, otypes, ftypes, hours, date_range = await loop.run_in_executor(executor, self.parameters, registry)
+
+        self.set_header('Content-Type', FORMATS[fmt][0])
+        if self.attachment:
+            self.set_header('Content-Disposition', 'attachment; filename="{}"'.format(exportName(date_range, fmt)))
+
+        with metrics.stage('server.' + type(self).__name__):
+            data = writeChunks(self.chunks(registry, agg, names, otypes, ftypes, hours, date_range), fmt)
+            while True:
+                block = await loop.run_in_executor(executor, next, data, None)
+                if block is None:
+                    break
+                self.write(block)
+                try:
+                    await self.flush()
+                except StreamClosedError:
+                    # O cliente desistiu do download
+                    data.close()
+                    return
+
+
+class ExportHandler(QueryHandler):
+    """Linhas da seleção como um arquivo para download (CSV, por padrão)."""
+
+    default_format = 'csv'
+    aggregates = ['rows']
+    attachment = True
+
+
+ROUTES = [
+    ('/metrics', MetricsHandler, {}),
+    ('/query', QueryHandler, {}),
+    ('/export', ExportHandler, {}),
+]
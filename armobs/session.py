@@ -0,0 +1,54 @@
+# Execução dos cálculos das visualizações fora do laço de eventos do servidor
+#
+# Os cálculos (seleção, paginação, agregação) de cada visualização são feitos
+# em um executor (threads), de modo que o servidor continue respondendo
+# enquanto eles são realizados. Cada visualização de cada sessão tem um
+# contador de chamadas: uma chamada que chega enquanto outra ainda aguarda ou
+# está em andamento torna a anterior obsoleta, e apenas o resultado da chamada
+# mais recente é exibido. Uma pequena espera antes do cálculo agrupa as
+# mudanças rápidas dos widgets (e.g., ao arrastar o seletor de datas).
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Executor compartilhado pelas sessões do processo
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='armobs')
+
+
+class Superseded(Exception):
+    """A chamada foi substituída por uma chamada mais recente."""
+
+
+class LatestCall:
+    """Executa cálculos no executor, descartando os resultados das chamadas substituídas.
+
+    ``delay`` (em segundos) é a espera antes do início do cálculo, durante a
+    qual uma nova chamada substitui a anterior sem que ela seja calculada.
+    Sem ``executor`` (e.g., no navegador, onde não há threads), o cálculo é
+    feito no próprio laço de eventos.
+    """
+
+    def __init__(self, delay=0.15, executor=executor):
+        self.delay = delay
+        self.executor = executor
+        self.generation = 0
+
+    async def __call__(self, func, *args, **kwargs):
+        """Resultado de ``func(*args, **kwargs)``; levanta Superseded se houver uma chamada mais recente."""
+        self.generation += 1
+        generation = self.generation
+
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if generation != self.generation:
+            raise Superseded()
+
+        if self.executor is None:
+            return func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        if generation != self.generation:
+            raise Superseded()
+        return result
@@ -0,0 +1,94 @@
+# Inventário compartilhado pelas sessões do servidor
+#
+# Com o panel serve, o script do dashboard é executado a cada nova sessão, mas
+# os módulos importados (como este) são carregados uma única vez por processo.
+# O inventário de cada origem é lido e indexado uma única vez e todas as
+# sessões utilizam o mesmo Dataset (somente leitura), sem cópias. As seleções
+# são guardadas em um cache único, limitado pela memória utilizada, de modo
+# que uma mesma seleção feita por diferentes usuários é calculada uma só vez.
+
+import logging
+import threading
+
+from armobs import metrics
+from armobs.cache import LRUCache
+from armobs.dataset import WindowedDataset
+from armobs.ingest import openInventory
+from armobs.table import PagedTable
+
+# Memória máxima (em bytes) ocupada pelas seleções guardadas
+RESULT_CACHE_BYTES = 256 * 1024 ** 2
+
+results = LRUCache(maxsize=None, maxbytes=RESULT_CACHE_BYTES)
+
+# Ordenações das seleções exibidas na tabela
+sharedTable = PagedTable(maxsize=32)
+
+metrics.registry.registerCache('selecao', results)
+metrics.registry.registerCache('ordenacao', sharedTable.orders)
+
+_datasets = {}
+_refreshers = {}
+_locks = {}
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher(threading.Thread):
+    """Verifica periodicamente (em segundo plano) se o inventário foi atualizado.
+
+    A leitura e a indexação das atualizações são feitas nesta thread, sem
+    bloquear o servidor; as sessões acompanham ``WindowedDataset.version``.
+    """
+
+    def __init__(self, windowed, interval):
+        super().__init__(name='armobs-refresh', daemon=True)
+        self.windowed = windowed
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                rows = self.windowed.refresh()
+            except Exception:
+                logger.exception('Falha ao atualizar o inventário')
+                continue
+            if rows:
+                logger.info('%d linhas novas no inventário (versão %d)', rows, self.windowed.version)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def sharedDataset(location, drop=('Nome do Arquivo',), refresh=None):
+    """WindowedDataset do inventário em ``location`` (armobs.ingest.openInventory), compartilhado pelo processo.
+
+    Com ``refresh`` (em segundos), as atualizações da origem são verificadas
+    periodicamente em segundo plano.
+    """
+    key = (location, tuple(drop))
+    # Cada origem tem o seu próprio lock, de modo que diferentes origens são lidas ao mesmo tempo
+    with _lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        windowed = _datasets.get(key)
+        if windowed is None:
+            windowed = WindowedDataset(openInventory(location), drop=drop, cache=results)
+            _datasets[key] = windowed
+        if refresh and key not in _refreshers:
+            _refreshers[key] = Refresher(windowed, refresh)
+            _refreshers[key].start()
+    return windowed
+
+
+def clearShared():
+    """Descarta os inventários e as seleções guardadas (e.g., para liberar a memória)."""
+    with _lock:
+        for refresher in _refreshers.values():
+            refresher.stop()
+        _refreshers.clear()
+        _datasets.clear()
+    results.clear()
+    sharedTable.orders.clear()
@@ -0,0 +1,240 @@
+# Inventários de várias origens exibidos em conjunto pelo dashboard
+#
+# O dashboard pode comparar inventários coletados em diferentes máquinas ou
+# por diferentes usuários (e.g., os discos da XC50 e da Egeon, ou os CSVs
+# mon_rec_obs_final-edu.csv e mon_rec_obs_final-alex.csv). As origens são
+# definidas pela variável de ambiente ARMOBS_SOURCES, como uma lista de pares
+# nome=origem separados por vírgulas (cada origem é um diretório de partições
+# mensais, um CSV local ou uma URL; veja armobs.ingest.openInventory):
+#
+#   ARMOBS_SOURCES=Egeon=mon_rec_obs_final.csv,XC50=inventario_xc50/,edu=mon_rec_obs_final-edu.csv
+#
+# Cada origem mantém o seu próprio inventário, as suas seleções memoizadas e a
+# sua atualização incremental (armobs.shared.sharedDataset). As origens são
+# lidas e indexadas ao mesmo tempo, em threads, de modo que o tempo de
+# carregamento é o da origem mais lenta (e não a soma dos tempos). As seleções
+# de várias origens são concatenadas e identificadas pela coluna 'Fonte'.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from armobs import metrics
+from armobs.analytics import SeriesAnalytics, analyticsFor
+from armobs.cache import LRUCache
+from armobs.export import CHUNK_ROWS
+from armobs.ingest import isUrl
+from armobs.schema import CATEGORICAL_COLUMNS
+from armobs.selection import selectionKey
+from armobs.shared import results, sharedDataset
+from armobs.synoptic import hourMask
+
+SOURCE_COLUMN = 'Fonte'
+
+# Threads utilizadas na leitura e na indexação das origens
+loader = ThreadPoolExecutor(8, thread_name_prefix='armobs-fonte')
+
+
+def sourceName(location):
+    """Nome de uma origem sem nome explícito (nome do arquivo ou do diretório, sem a extensão)."""
+    return os.path.splitext(os.path.basename(location.rstrip('/')))[0] or location
+
+
+def parseSources(spec, default=None):
+    """Origens ({nome: origem}) definidas em ``spec`` ('nome=origem,...'); sem ``spec``, apenas ``default``."""
+    sources = {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, location = item.partition('=')
+        # URLs sem nome podem conter '=' (e.g., na query)
+        if not sep or isUrl(item):
+            name, location = sourceName(item), item
+        sources[name.strip()] = location.strip()
+    if not sources and default is not None:
+        sources[sourceName(default)] = default
+    return sources
+
+
+def _parallel(func, items):
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(loader.map(func, items))
+
+
+def concatSources(parts):
+    """Concatena as seleções ({nome: seleção}) em ordem cronológica, com a coluna 'Fonte'."""
+    names = list(parts)
+    dfsp = pd.concat([part.assign(**{SOURCE_COLUMN: name}) for name, part in parts.items()], ignore_index=True)
+    dfsp[SOURCE_COLUMN] = pd.Categorical(dfsp[SOURCE_COLUMN], categories=names)
+    # As categorias de cada origem podem ser diferentes (e a concatenação as converte em texto)
+    for column in CATEGORICAL_COLUMNS:
+        if column in dfsp.columns and not isinstance(dfsp[column].dtype, pd.CategoricalDtype):
+            dfsp[column] = dfsp[column].astype('category')
+    return dfsp.sort_values('Data da Observação', kind='stable', ignore_index=True)
+
+
+class SourceRegistry:
+    """Inventários de várias origens ({nome: armobs.dataset.WindowedDataset}) consultados em conjunto.
+
+    As consultas recebem a lista das origens escolhidas (``names``). Com uma
+    única origem no registro, as seleções são as do próprio inventário (sem a
+    coluna 'Fonte').
+    """
+
+    def __init__(self, datasets, cache=None):
+        self.datasets = dict(datasets)
+        self.cache = LRUCache(32) if cache is None else cache
+
+    @property
+    def names(self):
+        return list(self.datasets)
+
+    @property
+    def version(self):
+        """Versão do conjunto de inventários (muda quando alguma origem é atualizada)."""
+        return tuple(windowed.version for windowed in self.datasets.values())
+
+    def bounds(self, names=None):
+        """Primeira e última data da observação das origens ``names`` (todas, se None)."""
+        names = self.names if names is None else names
+        bounds = [self.datasets[name].inventory.bounds() for name in names]
+        bounds = [(first, last) for first, last in bounds if first is not None]
+        if not bounds:
+            return None, None
+        return min(first for first, last in bounds), max(last for first, last in bounds)
+
+    def columns(self, start_date, end_date):
+        """Colunas das seleções (as do inventário da primeira origem e, com várias origens, 'Fonte')."""
+        windowed = next(iter(self.datasets.values()))
+        columns = list(windowed.cover(start_date, end_date).frame.columns)
+        return columns + [SOURCE_COLUMN] if len(self.datasets) > 1 else columns
+
+    def cover(self, names, start_date, end_date):
+        """Datasets ({nome: Dataset}) das origens ``names`` que contêm o período, carregados ao mesmo tempo."""
+        names = [name for name in self.datasets if name in names]
+        datasets = _parallel(lambda name: self.datasets[name].cover(start_date, end_date), names)
+        return dict(zip(names, datasets))
+
+    def selection(self, names, otype_w, ftype_w, synoptic_time, date_range):
+        """Seleção do inventário das origens ``names`` (memoizada pelos parâmetros dos widgets)."""
+        start_date, end_date = date_range
+        if len(self.datasets) == 1:
+            windowed = next(iter(self.datasets.values()))
+            return windowed.cover(start_date, end_date).selection(otype_w, ftype_w, synoptic_time, date_range)
+
+        datasets = self.cover(names, start_date, end_date)
+        key = ((SOURCE_COLUMN,) + tuple((name, dataset.selection.version) for name, dataset in datasets.items()) +
+               selectionKey(otype_w, ftype_w, synoptic_time, date_range))
+        dfsp = self.cache.get(key)
+        if dfsp is None:
+            with metrics.stage('sources.selection') as stage:
+                if datasets:
+                    parts = dict(zip(datasets, _parallel(
+                        lambda dataset: dataset.selection(otype_w, ftype_w, synoptic_time, date_range),
+                        datasets.values())))
+                else:
+                    # Nenhuma origem escolhida: seleção vazia, com as mesmas colunas
+                    name, windowed = next(iter(self.datasets.items()))
+                    parts = {name: windowed.cover(start_date, end_date).frame.iloc[:0]}
+                dfsp = concatSources(parts)
+                stage.rows = len(dfsp)
+            self.cache[key] = dfsp
+        return dfsp
+
+    def chunks(self, names, otype_w, ftype_w, synoptic_time, date_range, chunk_rows=CHUNK_ROWS):
+        """Seleção das origens ``names`` em blocos de até ``chunk_rows`` linhas, em ordem cronológica.
+
+        Apenas as posições das linhas escolhidas são calculadas de uma vez;
+        cada bloco é extraído do inventário quando solicitado (e não é
+        guardado no cache das seleções). Há sempre ao menos um bloco (vazio,
+        com as colunas da seleção, se nenhuma linha for escolhida).
+        """
+        start_date, end_date = date_range
+        hour_mask = hourMask(synoptic_time)
+        # Com uma única origem, a origem escolhida não é considerada (como em ``selection``)
+        datasets = self.cover(self.names if len(self.datasets) == 1 else names, start_date, end_date)
+        if not datasets:
+            name, windowed = next(iter(self.datasets.items()))
+            datasets = {name: windowed.cover(start_date, end_date)}
+            positions = [np.empty(0, dtype=np.intp)]
+        else:
+            positions = [dataset.index.rows(otype_w, ftype_w, hour_mask, start_date, end_date)
+                         for dataset in datasets.values()]
+        indexes = [dataset.index for dataset in datasets.values()]
+
+        # Ordem cronológica das linhas de todas as origens (na ordem das origens, para uma mesma data)
+        dates = np.concatenate([index.dates[rows] for index, rows in zip(indexes, positions)])
+        source = np.repeat(np.arange(len(indexes)), [len(rows) for rows in positions])
+        rows = np.concatenate(positions)
+        order = np.argsort(dates, kind='stable')
+
+        for lo in range(0, max(len(order), 1), chunk_rows):
+            block = order[lo:lo + chunk_rows]
+            parts = {name: index.take(np.sort(rows[block[source[block] == k]]))
+                     for k, (name, index) in enumerate(zip(datasets, indexes))}
+            if len(self.datasets) == 1:
+                yield next(iter(parts.values()))
+            else:
+                yield concatSources(parts)
+
+    def sizeByOtype(self, names, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Tamanho total de cada tipo de observação escolhido, somado sobre as origens ``names``."""
+        datasets = self.cover(names, start_date, end_date)
+        sizes = [dataset.rollup.sizeByOtype(otype_w, ftype_w, hour_mask, start_date, end_date)
+                 for dataset in datasets.values()]
+        if not sizes:
+            return pd.Series(0.0, index=list(otype_w), name='Tamanho do Download (KB)')
+        total = sizes[0]
+        for size in sizes[1:]:
+            total = total + size
+        return total
+
+    def total(self, names, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Tamanho total da seleção no período, somado sobre as origens ``names``."""
+        return float(self.sizeByOtype(names, otype_w, ftype_w, hour_mask, start_date, end_date).sum())
+
+    def analytics(self, names, start_date, end_date):
+        """Análise das séries ({nome: armobs.analytics.SeriesAnalytics}) das origens ``names``, atualizada com o período."""
+        datasets = self.cover(names, start_date, end_date)
+        return {name: analyticsFor(self.datasets[name]).update(dataset) for name, dataset in datasets.items()}
+
+    def _combine(self, method, names, otype_w, ftype_w, hour_mask, start_date, end_date):
+        analytics = self.analytics(names, start_date, end_date) or {None: SeriesAnalytics()}
+        parts = {name: getattr(series, method)(otype_w, ftype_w, hour_mask, start_date, end_date)
+                 for name, series in analytics.items()}
+        if len(self.datasets) == 1:
+            return next(iter(parts.values()))
+        dfs = pd.concat([part.assign(**{SOURCE_COLUMN: name}) for name, part in parts.items()], ignore_index=True)
+        return dfs.sort_values('Data da Observação', kind='stable', ignore_index=True)
+
+    def missing(self, names, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Ciclos sem arquivo no período (armobs.analytics), nas origens ``names``."""
+        return self._combine('missing', names, otype_w, ftype_w, hour_mask, start_date, end_date)
+
+    def outliers(self, names, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Arquivos com tamanho atípico no período (armobs.analytics), nas origens ``names``."""
+        return self._combine('outliers', names, otype_w, ftype_w, hour_mask, start_date, end_date)
+
+    def dailyTotals(self, names, otype_w, ftype_w, hour_mask, start_date, end_date):
+        """Tamanho total de cada dia do período, somado sobre as origens ``names``."""
+        totals = [series.dailyTotals(otype_w, ftype_w, hour_mask, start_date, end_date)
+                  for series in self.analytics(names, start_date, end_date).values()]
+        if not totals:
+            return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]), name='Tamanho do Download (KB)')
+        total = totals[0]
+        for series in totals[1:]:
+            total = total.add(series, fill_value=0)
+        return total
+
+
+def openSources(sources, drop=('Nome do Arquivo',), refresh=None):
+    """Registro com os inventários das origens ({nome: origem}), lidos ao mesmo tempo e compartilhados pelo processo."""
+    names = list(sources)
+    with metrics.stage('sources.open'):
+        datasets = _parallel(lambda name: sharedDataset(sources[name], drop=drop, refresh=refresh), names)
+    return SourceRegistry(dict(zip(names, datasets)), cache=results)
@@ -0,0 +1,22 @@
+# Horários sinóticos representados como uma máscara de bits
+#
+# Cada horário escolhido no seletor corresponde ao bit (1 << hora) de um
+# inteiro; qualquer combinação de 00Z, 06Z, 12Z e 18Z é representada por
+# uma única máscara, testada contra a hora (inteira) de cada linha ou
+# combinação do índice do inventário.
+
+SYNOPTIC_TIMES = ['00Z', '06Z', '12Z', '18Z']
+
+
+def hourMask(synoptic_times):
+    """Máscara de bits correspondente a uma lista de horários (e.g., ['00Z', '18Z'])."""
+    mask = 0
+    for label in synoptic_times:
+        mask |= 1 << int(label.rstrip('Z'))
+    return mask
+
+
+def maskHours(mask):
+    """Horas (inteiras) contidas em uma máscara."""
+    return tuple(hour for hour in range(24) if (mask >> hour) & 1)
+
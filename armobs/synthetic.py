@@ -0,0 +1,147 @@
+# Inventários sintéticos no formato do mon_rec_obs_final.csv
+#
+# Utilizados para medir o desempenho do dashboard (benchmarks/) com inventários
+# de tamanho configurável, sem acesso aos discos da XC50/Egeon: um ciclo a cada
+# 6 horas, com um arquivo por tipo de observação e tipo de arquivo. O tamanho
+# dos arquivos varia em torno de um valor típico de cada tipo de observação.
+#
+# syntheticObsTree cria também uma árvore de diretórios das observações (e dos
+# logs do GSI) no formato percorrido pelo armobs.collector (utilizada nos
+# testes da coleta); os arquivos são esparsos, com o tamanho e a data de
+# modificação de cada arquivo, mas sem conteúdo.
+#
+# Uso:
+#
+#   python -m armobs.synthetic --years 5 inventario_5anos.csv
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from armobs.collector import COLUMNS, OBS_LAYOUTS
+from armobs.gsilog import LOG_LAYOUT
+
+OTYPES = ['1bamua', '1bhrs4', 'airsev', 'atms', 'crisf4', 'eshrs3', 'esmhs', 'gome', 'gpsipw', 'gpsro',
+          'mtiasi', 'osbuv8', 'prepbufr', 'satwnd', 'sevcsr']
+
+FTYPES = ['gdas', 'gfs']
+
+
+def syntheticInventory(years=1, start='2023-01-01', otypes=OTYPES, ftypes=FTYPES, missing=0.0, seed=0):
+    """Inventário sintético com ``years`` anos de ciclos (mesmas colunas e tipos do CSV lido pelo dashboard).
+
+    ``missing`` é a fração de arquivos ausentes (removidos aleatoriamente).
+    """
+    rng = np.random.default_rng(seed)
+    cycles = pd.date_range(start, periods=int(round(years * 365.25 * 4)), freq='6h')
+    ncycles, nf, no = len(cycles), len(ftypes), len(otypes)
+
+    # Uma linha por (ciclo, tipo de arquivo, tipo de observação), em ordem cronológica
+    cycle = np.repeat(np.arange(ncycles), nf * no)
+    fcode = np.tile(np.repeat(np.arange(nf), no), ncycles)
+    ocode = np.tile(np.arange(no), ncycles * nf)
+    if missing > 0:
+        keep = rng.random(len(cycle)) >= missing
+        cycle, fcode, ocode = cycle[keep], fcode[keep], ocode[keep]
+    nrows = len(cycle)
+
+    obs_date = cycles.values[cycle]
+    hour = cycles.hour.values[cycle]
+
+    # Tamanho típico de cada tipo de observação (os arquivos gfs são menores)
+    typical = rng.lognormal(mean=17.0, sigma=1.5, size=no)
+    scale = np.where(fcode == 0, 1.0, 0.6)
+    size = typical[ocode] * scale * rng.lognormal(mean=0.0, sigma=0.1, size=nrows)
+
+    # Disponibilidade dos arquivos (e início do ciclo AD) algumas horas após o horário sinótico
+    latency = pd.to_timedelta(rng.gamma(4.0, 45.0, size=nrows), unit='min').values
+    download = obs_date + np.timedelta64(3, 'h') + latency
+
+    ad_latency = pd.to_timedelta(rng.normal(17 * 60, 30, size=ncycles), unit='min')
+    ad_start = (cycles + ad_latency).strftime('%Y-%m-%d %H:%M:%S').values.astype(object)
+    # Ciclos sem log do GSI
+    no_log = rng.random(ncycles) < 0.01
+    ad_start[no_log] = cycles[no_log].strftime('%Y-%m-%d NaT').values
+
+    names = np.array(['{}.t{:02d}z.{}.tm00.bufr_d'.format(ftype, h, otype)
+                      for ftype in ftypes for h in range(24) for otype in otypes], dtype=object)
+
+    dfs = pd.DataFrame({
+        'Tamanho do Download (KB)': size.astype(np.int64),
+        'Data do Download': download.astype('datetime64[s]').astype('datetime64[ns]'),
+        'Fuso Horário': np.full(nrows, -3),
+        'Nome do Arquivo': names[(fcode * 24 + hour) * no + ocode],
+        'Início do Ciclo AD': ad_start[cycle],
+        'Tipo de Arquivo': np.asarray(ftypes, dtype=object)[fcode],
+        'Horário Sinótico': hour,
+        'Tipo de Observação': np.asarray(otypes, dtype=object)[ocode],
+        'Data da Observação': obs_date,
+    })
+    return dfs[COLUMNS]
+
+
+def writeObsFile(obs_root, cycle, ftype, otype, size=1024, layout='egeon', mtime=None):
+    """Cria o arquivo de observação (esparso) de um ciclo; retorna o caminho do arquivo."""
+    cycle = pd.Timestamp(cycle)
+    path = os.path.join(OBS_LAYOUTS[layout].format(root=obs_root, date=cycle),
+                        '{}.t{:02d}z.{}.tm00.bufr_d'.format(ftype, cycle.hour, otype))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    # Disponibilidade do arquivo algumas horas após o horário sinótico
+    mtime = cycle + pd.Timedelta(hours=3) if mtime is None else pd.Timestamp(mtime)
+    os.utime(path, (mtime.timestamp(), mtime.timestamp()))
+    return path
+
+
+def writeGsiLog(log_root, cycle, delay='17:03:09'):
+    """Cria o log do GSI de um ciclo, com a linha "STARTING DATE-TIME" no início; retorna o caminho do log.
+
+    O GSI inicia ``delay`` após o horário sinótico (possivelmente no dia seguinte).
+    """
+    cycle = pd.Timestamp(cycle)
+    start = cycle + pd.Timedelta(delay)
+    path = os.path.join(LOG_LAYOUT.format(root=log_root, date=cycle),
+                        'gsiStdout_{:%Y%m%d%H}.runTime-{:%Y%m%d%H}00.log'.format(cycle, cycle))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(' GSI\n STARTING DATE-TIME  {}  {:%H:%M:%S}.123  001  SUN   2459946\n'.format(
+            start.strftime('%b %d,%Y').upper(), start))
+    return path
+
+
+def syntheticObsTree(obs_root, log_root=None, cycles=8, start='2023-01-01', otypes=OTYPES, ftypes=FTYPES,
+                     layout='egeon', seed=0):
+    """Árvore de diretórios com ``cycles`` ciclos de observações (e os logs do GSI) lida pelo armobs.collector.
+
+    Retorna os ciclos criados.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=cycles, freq='6h')
+    for cycle in dates:
+        for ftype in ftypes:
+            for otype in otypes:
+                writeObsFile(obs_root, cycle, ftype, otype, size=int(rng.integers(1024, 65536)), layout=layout)
+        if log_root is not None:
+            writeGsiLog(log_root, cycle)
+    return list(dates)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera um inventário sintético no formato do mon_rec_obs_final.csv.')
+    parser.add_argument('output', help='arquivo CSV de saída')
+    parser.add_argument('--years', type=float, default=1, help='número de anos de ciclos')
+    parser.add_argument('--start', default='2023-01-01', help='data do primeiro ciclo')
+    parser.add_argument('--missing', type=float, default=0.0, help='fração de arquivos ausentes')
+    parser.add_argument('--seed', type=int, default=0, help='semente do gerador de números aleatórios')
+    args = parser.parse_args(argv)
+
+    dfs = syntheticInventory(args.years, args.start, missing=args.missing, seed=args.seed)
+    dfs.to_csv(args.output, index=False)
+    print('{} linhas escritas em {}'.format(len(dfs), args.output))
+
+
+if __name__ == '__main__':
+    main()
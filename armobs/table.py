@@ -0,0 +1,70 @@
+# Tabela paginada da seleção do inventário
+#
+# A ordenação, a paginação e a projeção das colunas são feitas no servidor e
+# apenas a página visível é convertida para exibição. A ordenação de uma
+# seleção é calculada uma vez (argsort da coluna escolhida) e reutilizada ao
+# navegar entre as páginas.
+
+import numpy as np
+import pandas as pd
+
+from armobs import metrics
+from armobs.cache import LRUCache
+
+
+def pageCount(nrows, page_size):
+    return max(1, -(-nrows // page_size))
+
+
+class PagedTable:
+    """Paginação, ordenação e projeção de colunas de seleções do inventário."""
+
+    def __init__(self, maxsize=8):
+        # (id da seleção, coluna, ordem) -> (seleção, posições ordenadas); a
+        # referência à seleção garante que o id não seja reutilizado
+        self.orders = LRUCache(maxsize)
+
+    def order(self, dfsp, sort_by=None, ascending=True):
+        """Posições das linhas da seleção na ordem pedida (None mantém a ordem cronológica)."""
+        if sort_by is None or (sort_by == 'Data da Observação' and ascending):
+            return None
+
+        key = (id(dfsp), sort_by, ascending)
+        cached = self.orders.get(key)
+        if cached is not None and cached[0] is dfsp:
+            return cached[1]
+
+        with metrics.stage('table.order') as stage:
+            stage.rows = len(dfsp)
+            values = dfsp[sort_by]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.cat.codes
+            positions = np.argsort(values.to_numpy(), kind='stable')
+            if not ascending:
+                positions = positions[::-1]
+        self.orders[key] = (dfsp, positions)
+        return positions
+
+    def page(self, dfsp, page=1, page_size=50, sort_by=None, ascending=True, columns=None):
+        """Página ``page`` (a partir de 1) da seleção e o número total de páginas.
+
+        O índice da página indica a posição de cada linha na ordem pedida.
+        """
+        npages = pageCount(len(dfsp), page_size)
+        page = min(max(int(page), 1), npages)
+        lo = (page - 1) * page_size
+        hi = min(lo + page_size, len(dfsp))
+
+        positions = self.order(dfsp, sort_by, ascending)
+        positions = np.arange(lo, hi) if positions is None else positions[lo:hi]
+
+        with metrics.stage('table.page') as stage:
+            stage.rows = hi - lo
+            if columns is None:
+                dfpg = dfsp.take(positions)
+            else:
+                # Apenas as linhas da página e as colunas escolhidas são copiadas
+                cols = [i for i, col in enumerate(dfsp.columns) if col in columns]
+                dfpg = dfsp.iloc[positions, cols]
+            dfpg.index = pd.RangeIndex(lo, hi)
+        return dfpg, npages
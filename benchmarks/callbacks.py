@@ -0,0 +1,227 @@
+# Benchmark das visualizações do dashboard com inventários sintéticos
+#
+# Para cada tamanho de inventário (em anos de ciclos, armobs.synthetic), o
+# script do dashboard é executado como uma sessão (sem o servidor do Panel) e
+# são medidos:
+#
+# * a inicialização: primeira sessão (leitura e indexação do inventário) e
+#   sessões seguintes (inventário compartilhado, armobs.shared);
+# * as visualizações (getTotDown, getTable, plotLine e plotSelSize), chamadas
+#   diretamente para uma grade de parâmetros (tipos de observação, tipos de
+#   arquivo, horários sinóticos e períodos), sem (cold) e com (warm) as
+#   seleções em cache. O tempo inclui a construção do modelo Bokeh exibido.
+#
+# São registrados os percentis da latência (ms) e o pico de memória alocada
+# (tracemalloc, na maior seleção da grade) em um arquivo JSON. Com --baseline,
+# os resultados são comparados com uma execução anterior e o script termina
+# com erro se a mediana de alguma medida piorar além da tolerância.
+#
+# Uso (a partir da raiz do repositório):
+#
+#   python benchmarks/callbacks.py --years 1 5 20 --output benchmarks/resultados.json
+#   python benchmarks/callbacks.py --years 1 5 20 --baseline benchmarks/resultados.json --output /tmp/novos.json
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import runpy
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone
+from itertools import product
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'SMNA-Dashboard-ArmObs.py')
+sys.path.insert(0, ROOT)
+
+from armobs import SYNOPTIC_TIMES, shared  # noqa: E402
+from armobs.synthetic import OTYPES, syntheticInventory  # noqa: E402
+
+# Grade de parâmetros das visualizações
+OTYPE_SETS = [OTYPES[:1], OTYPES[:5], OTYPES]
+FTYPE_SETS = [['gdas'], ['gdas', 'gfs']]
+HOUR_SETS = [SYNOPTIC_TIMES[:1], SYNOPTIC_TIMES]
+WINDOWS = [30, 365, None]  # dias até o último ciclo (None: todo o inventário)
+
+
+def percentiles(times):
+    ms = np.asarray(times) * 1000
+    return {'n': len(ms), 'p50': float(np.percentile(ms, 50)), 'p90': float(np.percentile(ms, 90)),
+            'p99': float(np.percentile(ms, 99)), 'mean': float(ms.mean()), 'max': float(ms.max())}
+
+
+def peakMemory(func):
+    """Pico de memória (em bytes) alocada durante ``func()``."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def openSession(location):
+    """Executa o script do dashboard como uma nova sessão; retorna o seu namespace."""
+    os.environ['ARMOBS_DATA'] = location
+    os.environ.pop('ARMOBS_SOURCES', None)
+    os.environ['ARMOBS_REFRESH'] = '0'
+    session = runpy.run_path(SCRIPT)
+    # Sem a espera que agrupa as mudanças rápidas dos widgets
+    for call in session['calls'].values():
+        call.delay = 0
+    return session
+
+
+def views(session):
+    """Funções (nome, chamada) das visualizações, com os mesmos argumentos dos widgets."""
+    def render(view, *args):
+        return asyncio.run(session[view](*args)).get_root()
+
+    return [
+        ('getTotDown', lambda p: render('getTotDown', *p, 0)),
+        ('getTable', lambda p: render('getTable', *p, 'MB', 1, 50, 'Data da Observação', True, None, 0)),
+        ('getTable (ordenada)', lambda p: render('getTable', *p, 'MB', 1, 50, 'Tamanho do Download (KB)', False, None, 0)),
+        ('plotLine', lambda p: render('plotLine', *p, 0)),
+        ('plotSelSize', lambda p: render('plotSelSize', *p, 0)),
+    ]
+
+
+def grid(first_date, last_date, sources):
+    for otypes, ftypes, hours, days in product(OTYPE_SETS, FTYPE_SETS, HOUR_SETS, WINDOWS):
+        start = first_date if days is None else max(first_date, last_date - timedelta(days=days))
+        yield (otypes, ftypes, hours, (start.to_pydatetime(), last_date.to_pydatetime()), sources)
+
+
+def clearCaches():
+    shared.results.clear()
+    shared.sharedTable.orders.clear()
+
+
+def benchmark(years, repeat, workdir):
+    location = os.path.join(workdir, 'inventario_{}anos.csv'.format(years))
+    if not os.path.exists(location):
+        syntheticInventory(years).to_csv(location, index=False)
+
+    results = []
+
+    def record(name, times, peak=None, **extra):
+        entry = {'years': years, 'name': name, **extra, **percentiles(times)}
+        if peak is not None:
+            entry['peak_mb'] = peak / 1024 ** 2
+        results.append(entry)
+        print('{:>5} anos  {:<28} p50 {:9.1f} ms  p90 {:9.1f} ms{}'.format(
+            years, name + (' [{}]'.format(extra['cache']) if 'cache' in extra else ''),
+            entry['p50'], entry['p90'], '' if peak is None else '  pico {:8.1f} MB'.format(entry['peak_mb'])))
+
+    # Inicialização
+    first, sessions = [], []
+    for _ in range(repeat):
+        shared.clearShared()
+        start = time.perf_counter()
+        session = openSession(location)
+        first.append(time.perf_counter() - start)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        openSession(location)
+        sessions.append(time.perf_counter() - start)
+    shared.clearShared()
+    peak = peakMemory(lambda: openSession(location))
+    registry = session['registry']
+    record('inicialização (primeira sessão)', first, peak,
+           rows=sum(len(windowed.dataset) for windowed in registry.datasets.values()))
+    record('inicialização (sessões seguintes)', sessions)
+
+    # Visualizações
+    first_date, last_date = registry.bounds()
+    params = list(grid(first_date, last_date, registry.names))
+    for name, call in views(session):
+        cold, warm = [], []
+        for p in params:
+            for _ in range(repeat):
+                clearCaches()
+                start = time.perf_counter()
+                call(p)
+                cold.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                call(p)
+                warm.append(time.perf_counter() - start)
+
+        # Pico de memória da maior seleção (todos os tipos, horários e o período completo)
+        clearCaches()
+        peak = peakMemory(lambda: call(params[-1]))
+
+        record(name, cold, peak, cache='cold', grid=len(params))
+        record(name, warm, cache='warm', grid=len(params))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Medidas cuja mediana piorou além da tolerância em relação à execução de referência."""
+    def key(entry):
+        return (entry['years'], entry['name'], entry.get('cache'))
+
+    reference = {key(entry): entry for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        ref = reference.get(key(entry))
+        if ref is not None and entry['p50'] > tolerance * ref['p50']:
+            regressions.append((key(entry), ref['p50'], entry['p50']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mede o desempenho das visualizações do dashboard com inventários sintéticos.')
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 5, 20], help='tamanhos dos inventários (anos de ciclos)')
+    parser.add_argument('--repeat', type=int, default=3, help='repetições de cada medida')
+    parser.add_argument('--output', default='benchmarks/resultados.json', help='arquivo JSON com os resultados')
+    parser.add_argument('--baseline', default=None, help='resultados de referência (JSON) para a comparação')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='razão máxima entre as medianas atual e de referência')
+    parser.add_argument('--workdir', default=None, help='diretório dos inventários sintéticos (padrão: temporário)')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        results = []
+        for years in args.years:
+            results += benchmark(years, args.repeat, workdir)
+
+    import pandas as pd
+    import panel as pn
+
+    report = {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'versions': {'numpy': np.__version__, 'pandas': pd.__version__, 'panel': pn.__version__},
+        'results': results,
+    }
+
+    status = 0
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for (years, name, cache), before, after in regressions:
+            print('REGRESSÃO: {} anos, {}{}: {:.1f} ms -> {:.1f} ms'.format(
+                years, name, '' if cache is None else ' [{}]'.format(cache), before, after))
+        status = 1 if regressions else 0
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Resultados escritos em {}'.format(args.output))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,23 +12,67 @@
 
 inctime=/opt/inctime/bin/inctime
 
-datai=2023010100
-dataf=2023101900
+# Uso: ./get_inventory.sh [datai] [dataf]
+datai=${1:-2023010100}
+dataf=${2:-$(date -u +%Y%m%d)00}
 
 #datai=2023010800
 #dataf=2023010800
 
+# Disco das observações: egeon (padrão) ou xc50 (e.g., ORIGEM=xc50 ./get_inventory.sh).
+# Os inventários de diferentes origens podem ser comparados no dashboard (ARMOBS_SOURCES)
+origem=${ORIGEM:-egeon}
+
+# Inventário de cada origem: mon_rec_obs_final.csv (egeon) ou mon_rec_obs_final-<origem>.csv
+# (e.g., mon_rec_obs_final-xc50.csv); a retomada considera apenas o inventário da origem
+if [ ${origem} == "egeon" ]
+then
+  final=./mon_rec_obs_final.csv
+else
+  final=./mon_rec_obs_final-${origem}.csv
+fi
+
+# Ciclos anteriores ao último ciclo registrado que são verificados novamente
+# (os arquivos gdas chegam depois dos arquivos gfs do mesmo ciclo)
+recoleta=${RECOLETA:-8}
+
+# Se o arquivo final já existe, apenas os ciclos posteriores ao último ciclo
+# registrado (coluna 'Data da Observação') e os ${recoleta} ciclos anteriores a
+# ele são processados; apenas os arquivos ainda não registrados são acrescentados
+if [ -s ${final} ]
+then
+  ultimo=$(awk -F "," 'NR > 1 && $9 > ultimo {ultimo = $9} END {print ultimo}' ${final} | sed 's/[-: ]//g' | cut -c1-10)
+  # Um arquivo apenas com o cabeçalho não tem ciclo registrado
+  if [ -n "${ultimo}" ]
+  then
+    retomada=$(${inctime} ${ultimo} -$(( (recoleta - 1) * 6 ))hr %y4%m2%d2%h2)
+    if [ ${retomada} -gt ${datai} ]
+    then
+      datai=${retomada}
+    fi
+  fi
+fi
+
 data=${datai}
 
-mkdir txt csv
+mkdir -p txt csv
+
+novos=()
 
 while [ ${data} -le ${dataf} ]
 do
 
   echo ${data}
 
-  #dataobs=/extra2/XC50_EXTERNAL/${data}/dataout/NCEP
-  dataobs=/extra2/EGEON_PREPROC_BRUTOS/${data:0:4}/${data:4:2}/${data:6:2}
+  # Log do GSI do ciclo (vazio se não houver; o log do ciclo anterior não é reutilizado)
+  loggsi=""
+
+  if [ ${origem} == "xc50" ]
+  then
+    dataobs=/extra2/XC50_EXTERNAL/${data}/dataout/NCEP
+  else
+    dataobs=/extra2/EGEON_PREPROC_BRUTOS/${data:0:4}/${data:4:2}/${data:6:2}
+  fi
   dataloggsi=/extra2/XC50_SMNA_GSI_dataout_preOper/${data}
 
   ls -l --full-time ${dataobs} > ./txt/obs_${data}.txt
@@ -45,18 +89,21 @@ do
   #  loggsi=${dataloggsi}/gsiStdout_${data}.runTime-NaT.log
   fi
 
-  # Recupera a hora em que o programa principal do GSI iniciou
-  if [ -s ${loggsi} ]
+  # Recupera a data e a hora em que o programa principal do GSI iniciou (a
+  # leitura do log é interrompida na primeira ocorrência, no início do
+  # arquivo), e.g., "STARTING DATE-TIME  JAN 01,2023  17:03:09.123" -> "2023-01-01 17:03:09";
+  # o GSI dos ciclos das 12Z e das 18Z pode iniciar no dia seguinte
+  datafmt=${data:0:4}-${data:4:2}-${data:6:2}
+  if [ -n "${loggsi}" ] && [ -s ${loggsi} ]
   then
-    cat ${loggsi} | grep "STARTING DATE-TIME" | awk -F " " '{print $5}' | awk -F "." '{print $1}' > ./txt/gsilog_${data}.txt
+    grep -m1 "STARTING DATE-TIME" ${loggsi} | awk -F " " '{
+      split($4, d, ","); split($5, t, ".")
+      printf "%s-%02d-%s %s\n", d[2], (index("JANFEBMARAPRMAYJUNJULAUGSEPOCTNOVDEC", toupper($3)) + 2) / 3, d[1], t[1]
+    }' > ./csv/gsilog_${data}.csv
   else
-    echo "NaT" > ./txt/gsilog_${data}.txt
+    echo "${datafmt} NaT" > ./csv/gsilog_${data}.csv
   fi
 
-  # Adiciona a data ao horário de início do ciclo
-  datafmt=${data:0:4}-${data:4:2}-${data:6:2}
-  cat ./txt/gsilog_${data}.txt | awk -v var="${datafmt}" -F " " '{print var" "$0}' > ./csv/gsilog_${data}.csv
-
   # Remove a primeira linha
   sed -i '1d' ./txt/obs_${data}.txt
 
@@ -69,6 +116,11 @@ do
   # Remove a primeira linha
   sed -i '1d' ./csv/obs_${data}.csv
 
+  # Mantém apenas os arquivos do horário sinótico do ciclo (os diretórios da Egeon
+  # são diários e contêm os arquivos de todos os ciclos do dia)
+  grep -E ",[^,]*\.t${data:8:2}z\.[^,]*$" ./csv/obs_${data}.csv > ./csv/obs_${data}-1.csv
+  mv ./csv/obs_${data}-1.csv ./csv/obs_${data}.csv
+
   # Remove as linhas com as palavras "OK, index, atmanl, sfcanl, rtgsst, oisst, tmp"
 #  sed -i '/OK/d' ./csv/obs_${data}.csv
 #  sed -i '/index/d' ./csv/obs_${data}.csv
@@ -85,12 +137,20 @@ do
   gsi_start=$(cat ./csv/gsilog_${data}.csv)
   cat ./csv/obs_${data}.csv | awk -v var="${gsi_start}" -F " " '{print $0","var}' > ./csv/obs_${data}-2.csv
 
+  novos+=(./csv/obs_${data}-2.csv)
+
   data=$(${inctime} ${data} +6hr %y4%m2%d2%h2)
 
 done
 
-# Concatena todos os arquivos CSV
-cat ./csv/obs_*-2.csv > ./mon_rec_obs.csv
+if [ ${#novos[@]} -eq 0 ]
+then
+  echo "Nenhum ciclo novo a partir de ${datai}"
+  exit 0
+fi
+
+# Concatena os arquivos CSV dos ciclos processados nesta execução
+cat ${novos[@]} > ./mon_rec_obs.csv
 
 # Inclui uma coluna para o tipo de arquivo (gdas, gfs)
 cat ./mon_rec_obs.csv | awk -F "," '{print $4}' | awk -F "." '{printf ("%s\n", $1)}' > ftype.txt
@@ -111,11 +171,23 @@ cat ./mon_rec_obs.csv | awk -F "," '{print $4}' | awk -F "." '{print $2}' | sed
 # Monta o arquivo dates2.txt colando os arquivos dates.txt e hsin2.txt
 paste -d " " dates.txt hsin2.txt > dates2.txt
 
-# Adiciona as colunas ao arquivo final
+# Insere o cabeçalho, caso o arquivo final ainda não exista
+if [ ! -s ${final} ]
+then
+  echo 'Tamanho do Download (KB),Data do Download,Fuso Horário,Nome do Arquivo,Início do Ciclo AD,Tipo de Arquivo,Horário Sinótico,Tipo de Observação,Data da Observação' > ${final}
+fi
+
+# Acrescenta as colunas e os arquivos novos ao arquivo final (os arquivos dos
+# ciclos verificados novamente já registrados, com o mesmo nome e a mesma data
+# da observação, são descartados, assim como os arquivos repetidos nesta
+# execução, e.g., listados nos diretórios diários de mais de um ciclo)
 #paste -d "," mon_rec_obs.csv ftype.txt hsin.txt otype.txt dates2.txt gsilog.csv > mon_rec_obs_final.csv
-paste -d "," mon_rec_obs.csv ftype.txt hsin.txt otype.txt dates2.txt > mon_rec_obs_final.csv
+paste -d "," mon_rec_obs.csv ftype.txt hsin.txt otype.txt dates2.txt | \
+  awk -F "," 'NR == FNR {registrado[$4","$9] = 1; next} !(($4","$9) in registrado) {registrado[$4","$9] = 1; print}' ${final} - > ./mon_rec_obs_novos.csv
+cat ./mon_rec_obs_novos.csv >> ${final}
 
-# Insere na primeira linha
-sed -i '1 i\Tamanho do Download (KB),Data do Download,Fuso Horário,Nome do Arquivo,Início do Ciclo AD,Tipo de Arquivo,Horário Sinótico,Tipo de Observação,Data da Observação' ./mon_rec_obs_final.csv
+# Acrescenta os novos ciclos às partições mensais lidas pelo dashboard
+# (opcional; requer o pacote armobs e o pyarrow)
+#python -m armobs.ingest ${final} ./inventario
 
 exit 0
@@ -0,0 +1,75 @@
+# Análise das séries (armobs.analytics) com inventários sintéticos
+
+import pandas as pd
+import pytest
+
+from armobs.analytics import SeriesAnalytics, fillDate, forecastStorage
+from armobs.dataset import Dataset
+from armobs.synthetic import syntheticInventory
+
+OTYPES, FTYPES = ['atms', 'prepbufr'], ['gdas', 'gfs']
+HOURS = 1 | 1 << 6 | 1 << 12 | 1 << 18
+
+START, END = pd.Timestamp('2023-01-01'), pd.Timestamp('2023-04-30')
+
+
+@pytest.fixture
+def inventory():
+    return syntheticInventory(years=1 / 3, otypes=OTYPES, ftypes=FTYPES)
+
+
+def query(analytics, method):
+    return getattr(analytics, method)(OTYPES, FTYPES, HOURS, START, END)
+
+
+def late(inventory, date, ftype='gdas', otype='atms'):
+    """Inventário sem o arquivo do ciclo ``date`` e a linha do arquivo, acrescentada depois."""
+    row = ((inventory['Data da Observação'] == pd.Timestamp(date)) &
+           (inventory['Tipo de Arquivo'] == ftype) & (inventory['Tipo de Observação'] == otype))
+    assert row.sum() == 1
+    return inventory[~row].reset_index(drop=True), inventory[row]
+
+
+def test_update_merges_late_file_for_earlier_day(inventory):
+    before, row = late(inventory, '2023-02-05 06:00')
+    analytics = SeriesAnalytics().update(Dataset(before))
+    missing = query(analytics, 'missing')
+    assert (missing['Data da Observação'] == pd.Timestamp('2023-02-05 06:00')).sum() == 1
+
+    # O arquivo atrasado é incorporado ao inventário (em ordem cronológica) junto com novos ciclos
+    after = pd.concat([before, row, syntheticInventory(years=0.01, start='2023-05-01', otypes=OTYPES, ftypes=FTYPES)])
+    after = Dataset(after.sort_values('Data da Observação', kind='stable', ignore_index=True))
+    analytics.update(after)
+
+    assert (query(analytics, 'missing')['Data da Observação'] == pd.Timestamp('2023-02-05 06:00')).sum() == 0
+    rebuilt = SeriesAnalytics().update(after)
+    for method in ['missing', 'outliers']:
+        pd.testing.assert_frame_equal(query(analytics, method), query(rebuilt, method))
+
+
+def test_update_flags_late_outlier(inventory):
+    before, row = late(inventory, '2023-03-10 12:00', otype='prepbufr')
+    analytics = SeriesAnalytics().update(Dataset(before))
+    flagged = set(query(analytics, 'outliers')['Data da Observação'])
+    assert pd.Timestamp('2023-03-10 12:00') not in flagged
+
+    # Download truncado do prepbufr que chega depois dos ciclos seguintes
+    row = row.assign(**{'Tamanho do Download (KB)': row['Tamanho do Download (KB)'] // 10})
+    after = pd.concat([before, row]).sort_values('Data da Observação', kind='stable', ignore_index=True)
+    analytics.update(Dataset(after))
+
+    outliers = query(analytics, 'outliers')
+    assert set(outliers['Data da Observação']) - flagged == {pd.Timestamp('2023-03-10 12:00')}
+    pd.testing.assert_frame_equal(outliers, query(SeriesAnalytics().update(Dataset(after)), 'outliers'))
+
+
+def test_forecast_starts_from_stored_total(inventory):
+    daily = SeriesAnalytics().update(Dataset(inventory)).dailyTotals(OTYPES, FTYPES, HOURS, START, END)
+    whole = forecastStorage(daily, horizon=30)
+    # O período a partir de março parte do total armazenado em janeiro e fevereiro
+    split = pd.Timestamp('2023-03-01')
+    part = forecastStorage(daily[split:], horizon=30, initial=daily[:split - pd.Timedelta(days=1)].sum())
+
+    pd.testing.assert_series_equal(part['Acumulado'].dropna(), whole['Acumulado'].dropna()[split:])
+    capacity = whole['Acumulado'].iloc[len(daily) - 1] * 0.9
+    assert fillDate(part, capacity) == fillDate(whole, capacity)
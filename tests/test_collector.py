@@ -0,0 +1,101 @@
+# Coleta do inventário (armobs.collector) em uma árvore de diretórios sintética
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from armobs.collector import Checkpoint, collect
+from armobs.ingest import InventoryStore
+from armobs.synthetic import syntheticObsTree, writeObsFile
+
+OTYPES = ['atms', 'prepbufr']
+
+
+@pytest.fixture
+def tree(tmp_path):
+    obs, logs = tmp_path / 'obs', tmp_path / 'logs'
+    cycles = syntheticObsTree(str(obs), str(logs), cycles=8, start='2023-01-01', otypes=OTYPES)
+    return str(obs), str(logs), cycles
+
+
+def run(tree, output, first, last, **kwargs):
+    obs, logs, cycles = tree
+    return collect(first, last, obs, str(output), log_root=logs, **kwargs)
+
+
+def test_collect_writes_final_schema(tree, tmp_path):
+    output = tmp_path / 'inventario.csv'
+    written = run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 2, 18), batch=3)
+
+    dfs = pd.read_csv(output)
+    assert written == len(dfs) == 8 * 2 * len(OTYPES)
+    assert list(dfs.columns)[-1] == 'Data da Observação'
+    assert set(dfs['Tipo de Observação']) == set(OTYPES)
+    assert set(dfs['Tipo de Arquivo']) == {'gdas', 'gfs'}
+    assert dfs['Data da Observação'].is_monotonic_increasing
+    # O GSI dos ciclos das 12Z e das 18Z inicia no dia seguinte
+    delay = pd.to_datetime(dfs['Início do Ciclo AD']) - pd.to_datetime(dfs['Data da Observação'])
+    assert (delay == pd.Timedelta('17:03:09')).all()
+    assert Checkpoint(str(output) + '.checkpoint.json').load() == datetime(2023, 1, 2, 18)
+
+
+def test_incremental_without_checkpoint_keeps_csv(tree, tmp_path):
+    output = tmp_path / 'inventario.csv'
+    run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 2, 18))
+    (tmp_path / 'inventario.csv.checkpoint.json').unlink()
+
+    # Sem o checkpoint, a coleta continua a partir do último ciclo registrado no CSV
+    written = run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 2, 18), incremental=True)
+
+    assert written == 0
+    assert len(pd.read_csv(output)) == 8 * 2 * len(OTYPES)
+
+
+def test_incremental_collects_late_files(tree, tmp_path):
+    obs, logs, cycles = tree
+    output = tmp_path / 'inventario.csv'
+    writeObsFile(obs, datetime(2023, 1, 3, 0), 'gfs', 'atms')
+    run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 3, 0))
+
+    # O arquivo gdas do ciclo já coletado chega depois do arquivo gfs
+    writeObsFile(obs, datetime(2023, 1, 3, 0), 'gdas', 'atms', mtime=datetime(2023, 1, 3, 9))
+    written = run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 3, 6), incremental=True)
+
+    dfs = pd.read_csv(output)
+    assert written == 1
+    assert len(dfs) == 8 * 2 * len(OTYPES) + 2
+    assert not dfs.duplicated(['Nome do Arquivo', 'Data da Observação']).any()
+    assert 'gdas.t00z.atms.tm00.bufr_d' in set(dfs.loc[dfs['Data da Observação'] == '2023-01-03 00:00:00',
+                                                       'Nome do Arquivo'])
+
+
+def test_incremental_resumes_from_checkpoint(tree, tmp_path):
+    output = tmp_path / 'inventario.csv'
+    run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 1, 18))
+    written = run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 2, 18), incremental=True)
+
+    dfs = pd.read_csv(output)
+    assert written == 4 * 2 * len(OTYPES)
+    assert len(dfs) == 8 * 2 * len(OTYPES)
+    assert not dfs.duplicated(['Nome do Arquivo', 'Data da Observação']).any()
+
+
+def test_full_collect_rewrites_csv(tree, tmp_path):
+    output = tmp_path / 'inventario.csv'
+    run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 2, 18))
+    run(tree, output, datetime(2023, 1, 2), datetime(2023, 1, 2, 18))
+
+    assert len(pd.read_csv(output)) == 4 * 2 * len(OTYPES)
+
+
+def test_collect_appends_to_store(tree, tmp_path):
+    obs, logs, cycles = tree
+    output, store = tmp_path / 'inventario.csv', InventoryStore(str(tmp_path / 'inventario'))
+    writeObsFile(obs, datetime(2023, 1, 3, 0), 'gfs', 'atms')
+    run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 3, 0), store=store)
+
+    writeObsFile(obs, datetime(2023, 1, 3, 0), 'gdas', 'atms', mtime=datetime(2023, 1, 3, 9))
+    run(tree, output, datetime(2023, 1, 1), datetime(2023, 1, 3, 0), incremental=True, store=store)
+
+    assert store.rows() == len(pd.read_csv(output)) == 8 * 2 * len(OTYPES) + 2
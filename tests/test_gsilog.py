@@ -0,0 +1,33 @@
+# Início do GSI registrado nos logs (armobs.gsilog)
+
+import json
+import os
+from datetime import datetime
+
+from armobs.gsilog import GsiLogCache, gsiStart, parseStartLine
+from armobs.synthetic import writeGsiLog
+
+
+def test_parse_start_line():
+    line = b' STARTING DATE-TIME  JAN 01,2023  17:03:09.123  001  SUN   2459946'
+    assert parseStartLine(line) == '2023-01-01 17:03:09'
+    assert parseStartLine(b' STARTING DATE-TIME') is None
+    assert parseStartLine(b' STARTING DATE-TIME  ??? 01,2023  17:03:09.123') is None
+
+
+def test_start_after_midnight(tmp_path):
+    writeGsiLog(str(tmp_path), datetime(2023, 12, 31, 18), delay='7:30:00')
+    assert gsiStart(str(tmp_path), datetime(2023, 12, 31, 18)) == '2024-01-01 01:30:00'
+
+
+def test_cache_rereads_entries_without_date(tmp_path):
+    log = writeGsiLog(str(tmp_path), datetime(2023, 1, 1, 18))
+    path = tmp_path / 'gsi.json'
+    key = GsiLogCache.key(os.stat(log))
+    # Entrada gravada no formato anterior (apenas o horário)
+    path.write_text(json.dumps({key.split(':', 1)[1]: '11:03:09'}))
+
+    cache = GsiLogCache(str(path))
+    assert gsiStart(str(tmp_path), datetime(2023, 1, 1, 18), cache) == '2023-01-02 11:03:09'
+    cache.save()
+    assert json.loads(path.read_text()) == {key: '2023-01-02 11:03:09'}